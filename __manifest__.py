@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'Atributos Adicionales para Lotes',
-    'version': '18.0.2.0.0',
+    'version': '18.0.2.1.0',
     'category': 'Inventory/Inventory',
     'summary': 'Captura dimensiones, fotografías y gestión de reservas manuales (hold) en lotes',
     'description': """
@@ -19,22 +19,31 @@
     'data': [
         'security/ir.model.access.csv',
         'data/stock_lot_hold_cron.xml',
+        'data/stock_lot_image_cron.xml',
         'views/stock_lot_views.xml',
         'views/stock_move_views.xml',
         'views/stock_quant_views.xml',
+        'views/stock_picking_views.xml',
         'views/stock_lot_image_wizard_views.xml',
+        'views/stock_lot_image_import_wizard_views.xml',
+        'views/stock_picking_packing_list_wizard_views.xml',
+        'views/stock_quant_dimension_search_wizard_views.xml',
+        'views/stock_picking_slab_optimizer_wizard_views.xml',
         'views/stock_lot_hold_views.xml',
         'views/stock_lot_hold_wizard_views.xml',
+        'views/stock_lot_bloque_report_views.xml',
     ],
     'assets': {
         'web.assets_backend': [
             'stock_lot_dimensions/static/src/js/image_gallery_widget.js',
             'stock_lot_dimensions/static/src/js/image_preview_widget.js',
             'stock_lot_dimensions/static/src/js/status_icons_widget.js',
+            'stock_lot_dimensions/static/src/js/photo_upload_widget.js',
             'stock_lot_dimensions/static/src/css/image_gallery.css',
             'stock_lot_dimensions/static/src/xml/image_gallery.xml',
             'stock_lot_dimensions/static/src/xml/image_preview_widget.xml',
             'stock_lot_dimensions/static/src/xml/status_icons_widget.xml',
+            'stock_lot_dimensions/static/src/xml/photo_upload_widget.xml',
         ],
     },
     'installable': True,
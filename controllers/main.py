@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import shutil
+import tempfile
+
+from werkzeug.http import quote_etag
+
+from odoo import http
+from odoo.exceptions import AccessError, UserError
+from odoo.http import request
+
+UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class StockLotImageUploadController(http.Controller):
+    """
+    Subida de fotografías de lotes por multipart, opcionalmente en trozos.
+
+    El cliente envía el archivo en uno o varios POST con ``upload_id`` (32
+    hex), ``chunk_index`` y ``total_chunks``. Cada trozo se añade a un
+    archivo temporal en disco; con el último el archivo se mueve al
+    filestore como ir.attachment (sin leerlo en memoria ni pasarlo a
+    base64) y, si se indica ``lot_id``, se enlaza a un nuevo
+    stock.lot.image. Sin ``lot_id`` el adjunto queda pendiente para el
+    wizard de fotografías, que crea la fotografía al confirmar; así lo usa
+    el widget ``lot_photo_upload``, que envía el ``csrf_token`` en cada
+    trozo.
+    """
+
+    def _ruta_temporal(self, upload_id):
+        return os.path.join(
+            tempfile.gettempdir(),
+            f'stock_lot_upload_{request.env.cr.dbname}_{request.env.uid}_{upload_id}.part',
+        )
+
+    @http.route('/stock_lot_dimensions/upload', type='http', auth='user', methods=['POST'])
+    def upload_chunk(self, ufile, upload_id, lot_id=None, chunk_index=0, total_chunks=1, name=None, **kwargs):
+        if not UPLOAD_ID.match(upload_id or ''):
+            return request.make_json_response({'error': 'upload_id no válido'}, status=400)
+        chunk_index, total_chunks = int(chunk_index), int(total_chunks)
+        ruta = self._ruta_temporal(upload_id)
+        
+        # El primer trozo crea el archivo, los siguientes se añaden en orden
+        with open(ruta, 'wb' if chunk_index == 0 else 'ab') as destino:
+            shutil.copyfileobj(ufile.stream, destino, 1024 * 1024)
+        
+        if chunk_index < total_chunks - 1:
+            return request.make_json_response({'upload_id': upload_id, 'chunk_index': chunk_index})
+        
+        Image = request.env['stock.lot.image']
+        nombre = name or ufile.filename or 'Fotografía'
+        try:
+            if not lot_id:
+                adjunto = Image._crear_adjunto_desde_archivo(
+                    ruta, nombre, res_model='stock.lot.image.wizard'
+                )
+                return request.make_json_response({'id': adjunto.id, 'display_name': adjunto.name})
+            lot = request.env['stock.lot'].browse(int(lot_id)).exists()
+            if not lot:
+                return request.make_json_response({'error': 'Lote no encontrado'}, status=404)
+            image = Image._crear_desde_archivo(lot, ruta, nombre)
+        except (AccessError, UserError) as e:
+            return request.make_json_response({'error': str(e)}, status=403)
+        finally:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+        
+        return request.make_json_response({'id': image.id, 'display_name': image.display_name, 'lot_id': lot.id})
+
+    @http.route('/stock_lot_dimensions/picking/<int:picking_id>/hoja_contactos', type='http', auth='user')
+    def hoja_contactos(self, picking_id, **kwargs):
+        """Hoja de contactos (una sola imagen) con las fotos de los lotes de un picking"""
+        picking = request.env['stock.picking'].browse(picking_id).exists()
+        if not picking:
+            raise request.not_found()
+        picking.check_access('read')
+        
+        fotos = picking._get_fotos_principales()
+        # RFC 7232: el ETag va entre comillas y se compara en esa misma forma
+        etag = quote_etag(picking._get_hoja_contactos_etag(fotos))
+        headers = [('ETag', etag), ('Cache-Control', 'private, max-age=3600')]
+        if request.httprequest.if_none_match.contains_raw(etag):
+            return request.make_response(b'', headers=headers, status=304)
+        
+        return request.make_response(
+            picking._render_hoja_contactos(fotos),
+            headers=headers + [('Content-Type', 'image/jpeg')],
+        )
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """
+    Las fotografías anteriores a la cola de procesamiento no tienen las
+    versiones reducidas (image_1920/512/128) y nacen como 'procesado'.
+    Se encolan para que el cron genere sus miniaturas.
+    """
+    if not version:
+        return
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    imagenes = env['stock.lot.image'].with_context(active_test=False).search([
+        ('image', '!=', False),
+        ('image_128', '=', False),
+    ])
+    if imagenes:
+        imagenes.write({'estado_procesamiento': 'pendiente', 'error_procesamiento': False})
+        imagenes._encolar_procesamiento()
+        _logger.info("stock_lot_dimensions: %s fotografías encoladas para generar miniaturas", len(imagenes))
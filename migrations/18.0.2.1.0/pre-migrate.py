@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """
+    Antes de crear el índice único parcial (un solo hold activo por quant),
+    expirar los holds activos duplicados conservando el más reciente de cada
+    quant, que es el que ya se mostraba como hold activo.
+    """
+    if not version:
+        return
+    cr.execute("""
+        UPDATE stock_lot_hold h
+           SET estado = 'expirado'
+          FROM (
+                SELECT id,
+                       ROW_NUMBER() OVER (PARTITION BY quant_id ORDER BY create_date DESC, id DESC) AS posicion
+                  FROM stock_lot_hold
+                 WHERE estado = 'activo'
+          ) duplicados
+         WHERE h.id = duplicados.id
+           AND duplicados.posicion > 1
+    """)
+    if cr.rowcount:
+        _logger.info("stock_lot_dimensions: %s holds activos duplicados marcados como expirados", cr.rowcount)
@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 from . import stock_lot
 from . import stock_lot_image
+from . import stock_move
 from . import stock_move_line
 from . import stock_quant
 from . import stock_picking
 from . import stock_lot_hold 
-from . import sale_order
\ No newline at end of file
+from . import sale_order
+from . import stock_lot_bloque_report
\ No newline at end of file
@@ -22,6 +22,24 @@ class StockLot(models.Model):
         help='Ancho del producto en metros'
     )
     
+    x_area = fields.Float(
+        string='Área (m²)',
+        digits=(10, 4),
+        compute='_compute_area_volumen',
+        store=True,
+        index=True,
+        help='Alto x Ancho en metros cuadrados'
+    )
+    
+    x_volumen = fields.Float(
+        string='Volumen (m³)',
+        digits=(10, 6),
+        compute='_compute_area_volumen',
+        store=True,
+        index=True,
+        help='Área x Grosor en metros cúbicos'
+    )
+    
     # x_acabado = fields.Selection([
     #     ('pulido', 'Pulido'),
     #     ('mate', 'Mate'),
@@ -68,11 +86,13 @@ class StockLot(models.Model):
     
     x_bloque = fields.Char(
         string='Bloque',
+        index=True,
         help='Identificación del bloque de origen'
     )
 
     x_atado = fields.Char(
         string='Atado',
+        index=True,
         help='Identificación del atado'
     )
     
@@ -115,6 +135,13 @@ class StockLot(models.Model):
         store=False
     )
     
+    x_fotografia_principal_url = fields.Char(
+        string='URL Foto Principal',
+        compute='_compute_fotografia_principal_url',
+        store=True,
+        help='URL de la miniatura de la foto principal servida por /web/image'
+    )
+    
     x_tiene_fotografias = fields.Boolean(
         string='Tiene Fotos',
         compute='_compute_tiene_fotografias',
@@ -132,15 +159,49 @@ class StockLot(models.Model):
         help='Detalles especiales: rota, barreno, release, etc.'
     )
 
-    @api.depends('x_fotografia_ids')
+    @api.depends('x_alto', 'x_ancho', 'x_grosor')
+    def _compute_area_volumen(self):
+        """Área y volumen almacenados para poder totalizarlos con read_group"""
+        for record in self:
+            record.x_area = record.x_alto * record.x_ancho
+            # El grosor se captura en centímetros
+            record.x_volumen = record.x_area * record.x_grosor / 100.0
+
+    @api.depends('x_fotografia_ids', 'x_fotografia_ids.image_512')
     def _compute_fotografia_principal(self):
-        """Obtener la primera fotografía como principal"""
+        """
+        Obtener la primera fotografía como principal (versión de 512px, o el
+        original mientras no se ha procesado)
+        """
         for record in self:
             if record.x_fotografia_ids:
-                record.x_fotografia_principal = record.x_fotografia_ids[0].image
+                foto = record.x_fotografia_ids[0]
+                record.x_fotografia_principal = foto.image_512 or foto.image
             else:
                 record.x_fotografia_principal = False
 
+    @api.depends('x_fotografia_ids', 'x_fotografia_ids.sequence', 'x_fotografia_ids.image_128',
+                 'x_fotografia_ids.estado_procesamiento')
+    def _compute_fotografia_principal_url(self):
+        """
+        URL de la miniatura (image_128) de la foto principal. Las listas solo
+        transportan esta cadena; el navegador descarga la imagen en diferido
+        desde /web/image, que responde con ETag y, gracias al parámetro
+        ``unique``, con caché de larga duración. ``unique`` cambia cuando la
+        foto principal cambia, lo que invalida la caché del navegador.
+        Mientras la miniatura no existe (procesamiento pendiente o con
+        error) la URL apunta al original.
+        """
+        for record in self:
+            foto = record.x_fotografia_ids[:1]
+            if foto:
+                unique = fields.Datetime.to_string(foto.write_date or fields.Datetime.now())
+                unique = ''.join(c for c in unique if c.isdigit())
+                campo = 'image_128' if foto.estado_procesamiento == 'procesado' else 'image'
+                record.x_fotografia_principal_url = f'/web/image/stock.lot.image/{foto.id}/{campo}?unique={unique}'
+            else:
+                record.x_fotografia_principal_url = False
+
     @api.depends('x_fotografia_ids')
     def _compute_tiene_fotografias(self):
         """Verificar si el lote tiene fotografías"""
@@ -160,7 +221,7 @@ class StockLot(models.Model):
             'name': f'Fotografías de {self.name}',
             'type': 'ir.actions.act_window',
             'res_model': 'stock.lot.image',
-            'view_mode': 'kanban,tree,form',
+            'view_mode': 'kanban,list,form',
             'domain': [('lot_id', '=', self.id)],
             'context': {
                 'default_lot_id': self.id,
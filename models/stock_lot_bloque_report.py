@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, tools
+
+
+class StockLotBloqueReport(models.Model):
+    _name = 'stock.lot.bloque.report'
+    _description = 'Resumen de Inventario por Bloque y Atado'
+    _auto = False
+    _order = 'x_bloque, x_atado'
+
+    product_id = fields.Many2one('product.product', string='Producto', readonly=True)
+    company_id = fields.Many2one('res.company', string='Empresa', readonly=True)
+    x_bloque = fields.Char(string='Bloque', readonly=True)
+    x_atado = fields.Char(string='Atado', readonly=True)
+    cantidad_placas = fields.Integer(string='# Placas', readonly=True)
+    area_total = fields.Float(string='Total m²', digits=(16, 4), readonly=True)
+    grosor_min = fields.Float(string='Grosor Mín. (cm)', digits=(10, 2), readonly=True, aggregator='min')
+    grosor_max = fields.Float(string='Grosor Máx. (cm)', digits=(10, 2), readonly=True, aggregator='max')
+    grosores = fields.Char(string='Grosores (cm)', readonly=True)
+    placas_hold = fields.Integer(string='En Hold', readonly=True)
+    placas_reservadas = fields.Integer(string='Reservadas', readonly=True)
+    placas_con_foto = fields.Integer(string='Con Foto', readonly=True)
+    cobertura_fotos = fields.Float(string='% Con Foto', digits=(5, 1), readonly=True, aggregator='avg')
+
+    def init(self):
+        """
+        Una fila por (producto, empresa, bloque, atado) con las placas en
+        ubicaciones internas. Se apoya en los índices de stock_lot.x_bloque /
+        x_atado y en los valores almacenados de quants y lotes, sin campos
+        related calculados fila por fila.
+        """
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT MIN(q.id) AS id,
+                       q.product_id,
+                       q.company_id,
+                       l.x_bloque,
+                       l.x_atado,
+                       COUNT(*) AS cantidad_placas,
+                       SUM(COALESCE(l.x_area, 0)) AS area_total,
+                       MIN(l.x_grosor) AS grosor_min,
+                       MAX(l.x_grosor) AS grosor_max,
+                       STRING_AGG(DISTINCT TO_CHAR(l.x_grosor, 'FM990.09'), ', ') AS grosores,
+                       COUNT(*) FILTER (WHERE EXISTS (
+                            SELECT 1
+                              FROM stock_lot_hold h
+                             WHERE h.quant_id = q.id
+                               AND h.estado = 'activo'
+                               AND h.fecha_expiracion > (NOW() AT TIME ZONE 'UTC')
+                       )) AS placas_hold,
+                       COUNT(*) FILTER (WHERE q.reserved_quantity > 0) AS placas_reservadas,
+                       COUNT(*) FILTER (WHERE l.x_tiene_fotografias) AS placas_con_foto,
+                       100.0 * COUNT(*) FILTER (WHERE l.x_tiene_fotografias) / COUNT(*) AS cobertura_fotos
+                  FROM stock_quant q
+                  JOIN stock_lot l ON l.id = q.lot_id
+                  JOIN stock_location loc ON loc.id = q.location_id
+                 WHERE loc.usage = 'internal'
+                   AND q.quantity > 0
+                   AND (l.x_bloque IS NOT NULL OR l.x_atado IS NOT NULL)
+              GROUP BY q.product_id, q.company_id, l.x_bloque, l.x_atado
+            )
+        """)
+
+    def action_ver_placas(self):
+        """Abrir las placas (quants) del bloque/atado"""
+        self.ensure_one()
+        titulo = ' / '.join(filter(None, [self.x_bloque, self.x_atado]))
+        return {
+            'name': f'Placas {titulo}',
+            'type': 'ir.actions.act_window',
+            'res_model': 'stock.quant',
+            'view_mode': 'list,form',
+            'domain': [
+                ('product_id', '=', self.product_id.id),
+                ('company_id', '=', self.company_id.id),
+                ('lot_id.x_bloque', '=', self.x_bloque),
+                ('lot_id.x_atado', '=', self.x_atado),
+                ('location_id.usage', '=', 'internal'),
+                ('quantity', '>', 0),
+            ],
+            'context': {'create': False},
+            'target': 'current',
+        }
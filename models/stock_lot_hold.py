@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from datetime import timedelta
+import logging
+import time
+
+import psycopg2
+
+_logger = logging.getLogger(__name__)
 
 class StockLotHold(models.Model):
     _name = 'stock.lot.hold'
@@ -96,6 +102,65 @@ class StockLotHold(models.Model):
         store=True,
         readonly=True
     )
+    
+    company_id = fields.Many2one(
+        'res.company',
+        string='Empresa',
+        related='quant_id.company_id',
+        store=True,
+        readonly=True
+    )
+    
+    package_id = fields.Many2one(
+        'stock.quant.package',
+        string='Paquete',
+        related='quant_id.package_id',
+        store=True,
+        readonly=True
+    )
+    
+    owner_id = fields.Many2one(
+        'res.partner',
+        string='Propietario',
+        related='quant_id.owner_id',
+        store=True,
+        readonly=True
+    )
+    
+    cantidad = fields.Float(
+        string='Cantidad Bloqueada',
+        compute='_compute_cantidad',
+        store=True,
+        help='Cantidad libre (no reservada) del quant bloqueada por esta reserva'
+    )
+
+    _UNIQUE_HOLD_ACTIVO_INDEX = 'stock_lot_hold_quant_activo_uniq'
+
+    def init(self):
+        """Índice parcial para sumar rápidamente la cantidad bloqueada por holds activos"""
+        tools.create_index(
+            self._cr,
+            'stock_lot_hold_activo_producto_ubicacion_idx',
+            self._table,
+            ['producto_id', 'ubicacion_id', 'company_id', 'partner_id'],
+            where="estado = 'activo'",
+        )
+        # Un solo hold activo por quant, garantizado por la base de datos
+        self._cr.execute(f"""
+            CREATE UNIQUE INDEX IF NOT EXISTS {self._UNIQUE_HOLD_ACTIVO_INDEX}
+                ON {self._table} (quant_id)
+             WHERE estado = 'activo'
+        """)
+
+    @api.depends('quant_id.quantity', 'quant_id.reserved_quantity')
+    def _compute_cantidad(self):
+        """
+        Solo la parte no reservada del quant: lo ya reservado por el sistema
+        se descuenta en _get_available_quantity estándar y no debe restarse
+        dos veces.
+        """
+        for record in self:
+            record.cantidad = max(record.quant_id.quantity - record.quant_id.reserved_quantity, 0.0)
 
     @api.depends('fecha_inicio')
     def _compute_fecha_expiracion(self):
@@ -129,21 +194,106 @@ class StockLotHold(models.Model):
                 record.esta_expirado = False
 
     @api.model
-    def _cron_expire_holds(self):
-        """Cron job para expirar reservas automáticamente"""
+    def _get_domain_vigente(self):
+        """
+        Dominio de holds que bloquean: activos y no vencidos. Un hold con
+        fecha de expiración pasada deja de bloquear aunque el cron todavía
+        no lo haya marcado como expirado.
+        """
+        return [
+            ('estado', '=', 'activo'),
+            ('fecha_expiracion', '>', fields.Datetime.now()),
+        ]
+
+    @api.model
+    def _get_cantidad_bloqueada(self, product_id, location_id, company_id, lot_id=None, package_id=None,
+                                owner_id=None, partner_id=None, strict=False):
+        """
+        Cantidad total bloqueada por holds activos para un producto en una
+        ubicación (y sus hijas, salvo strict) de una empresa. Los holds del
+        partner permitido no bloquean. Lote, paquete y propietario se filtran
+        como en stock.quant._get_gather_domain. Se resuelve con un único SUM
+        en SQL.
+        """
+        domain = self._get_domain_vigente() + [
+            ('producto_id', '=', product_id.id),
+            ('company_id', '=', company_id),
+            ('ubicacion_id', '=' if strict else 'child_of', location_id.id),
+        ]
+        if lot_id:
+            domain.append(('lot_id', '=', lot_id.id))
+        elif strict:
+            # Los holds siempre son de quants con lote
+            return 0.0
+        if package_id or strict:
+            domain.append(('package_id', '=', package_id.id if package_id else False))
+        if owner_id or strict:
+            domain.append(('owner_id', '=', owner_id.id if owner_id else False))
+        if partner_id:
+            domain.append(('partner_id', '!=', partner_id))
+
+        [(cantidad,)] = self._read_group(domain, aggregates=['cantidad:sum'])
+        return cantidad or 0.0
+
+    @api.model
+    def _cron_expire_holds(self, batch_size=1000, time_limit=240, auto_commit=True):
+        """
+        Cron job para expirar reservas automáticamente.
+
+        Procesa los holds vencidos en lotes acotados de ``batch_size`` y hace
+        commit tras cada lote, de modo que si el job se interrumpe lo ya
+        expirado queda guardado y la siguiente ejecución retoma el resto.
+        Se detiene al superar ``time_limit`` segundos y notifica al cron el
+        trabajo pendiente para que se vuelva a lanzar. Al terminar se
+        programa para despertar justo en la siguiente expiración.
+        """
+        inicio = time.monotonic()
         now = fields.Datetime.now()
-        holds_expirados = self.search([
+        domain = [
             ('estado', '=', 'activo'),
             ('fecha_expiracion', '<=', now)
-        ])
+        ]
+        total_expirados = 0
         
-        if holds_expirados:
+        while True:
+            holds_expirados = self.search(domain, limit=batch_size, order='id')
+            if not holds_expirados:
+                break
+            
+            # El write recalcula el estado solo en los quants afectados
             holds_expirados.write({'estado': 'expirado'})
-            # Forzar recálculo de estados en los quants relacionados
-            quants = holds_expirados.mapped('quant_id')
-            quants._compute_estado_hold()
+            total_expirados += len(holds_expirados)
             
-        return True
+            if auto_commit:
+                self.env.cr.commit()
+            
+            if len(holds_expirados) < batch_size or time.monotonic() - inicio > time_limit:
+                break
+        
+        restantes = self.search_count(domain)
+        duracion = time.monotonic() - inicio
+        _logger.info(
+            "Expiración de holds: %s expirados en %.2fs, %s pendientes",
+            total_expirados, duracion, restantes
+        )
+        self.env['ir.cron']._notify_progress(done=total_expirados, remaining=restantes)
+        if not restantes:
+            self._programar_siguiente_expiracion()
+        return {'expirados': total_expirados, 'pendientes': restantes, 'segundos': duracion}
+
+    @api.model
+    def _programar_expiracion(self, fecha):
+        """Programar una ejecución del cron de expiración en la fecha dada"""
+        cron = self.env.ref('stock_lot_dimensions.ir_cron_expire_lot_holds', raise_if_not_found=False)
+        if cron and fecha:
+            cron.sudo()._trigger(at=fecha)
+
+    @api.model
+    def _programar_siguiente_expiracion(self):
+        """Programar el cron para el hold activo que vence primero"""
+        siguiente = self.search([('estado', '=', 'activo')], order='fecha_expiracion', limit=1)
+        if siguiente:
+            self._programar_expiracion(siguiente.fecha_expiracion)
 
     def action_cancelar_hold(self):
         """Cancelar manualmente una reserva"""
@@ -177,30 +327,89 @@ class StockLotHold(models.Model):
 
     @api.model_create_multi
     def create(self, vals_list):
-        """Al crear, verificar que no haya otro hold activo en el mismo quant"""
-        for vals in vals_list:
-            if 'quant_id' in vals:
-                hold_existente = self.search([
-                    ('quant_id', '=', vals['quant_id']),
-                    ('estado', '=', 'activo')
-                ], limit=1)
-                if hold_existente:
-                    raise models.ValidationError(
-                        f"Este lote ya tiene una reserva activa para {hold_existente.partner_id.name} "
-                        f"que expira el {hold_existente.fecha_expiracion.strftime('%d/%m/%Y')}"
-                    )
-        return super().create(vals_list)
+        """
+        Al crear, la base de datos garantiza que no haya otro hold activo en
+        el mismo quant (índice único parcial); la violación se traduce al
+        mensaje habitual para el usuario.
+        """
+        self.env['stock.quant']._invalidar_cache_lotes_disponibles()
+        self._expirar_vencidos([
+            vals.get('quant_id') for vals in vals_list if vals.get('estado', 'activo') == 'activo'
+        ])
+        try:
+            with self.env.cr.savepoint(flush=False):
+                holds = super().create(vals_list)
+                holds.flush_recordset()
+        except psycopg2.errors.UniqueViolation as e:
+            if e.diag.constraint_name != self._UNIQUE_HOLD_ACTIVO_INDEX:
+                raise
+            self._raise_hold_existente([vals.get('quant_id') for vals in vals_list])
+        holds._programar_expiracion(min(holds.mapped('fecha_expiracion'), default=False))
+        return holds
+
+    @api.model
+    def _expirar_vencidos(self, quant_ids):
+        """
+        Expirar los holds activos ya vencidos de los quants dados. Hasta que
+        pasa el cron siguen ocupando el índice único aunque ya no bloqueen
+        (_get_domain_vigente), y un hold nuevo sobre el quant chocaría con
+        ellos.
+        """
+        quant_ids = [quant_id for quant_id in quant_ids if quant_id]
+        if not quant_ids:
+            return
+        self.search([
+            ('quant_id', 'in', quant_ids),
+            ('estado', '=', 'activo'),
+            ('fecha_expiracion', '<=', fields.Datetime.now()),
+            ('id', 'not in', self.ids),
+        ]).write({'estado': 'expirado'})
+
+    @api.model
+    def _raise_hold_existente(self, quant_ids):
+        """Error amigable cuando alguno de los quants ya tiene un hold activo"""
+        hold_existente = self.search([
+            ('quant_id', 'in', [quant_id for quant_id in quant_ids if quant_id]),
+            ('estado', '=', 'activo')
+        ], limit=1)
+        if not hold_existente:
+            raise models.ValidationError("Este lote ya tiene una reserva activa.")
+        raise models.ValidationError(
+            f"Este lote ya tiene una reserva activa para {hold_existente.partner_id.name} "
+            f"que expira el {hold_existente.fecha_expiracion.strftime('%d/%m/%Y')}"
+        )
 
     def unlink(self):
         """Al eliminar, forzar recálculo de estados"""
         quants = self.mapped('quant_id')
         result = super().unlink()
+        self.env['stock.quant']._invalidar_cache_lotes_disponibles()
         quants._compute_estado_hold()
         return result
 
     def write(self, vals):
-        """Al modificar estado, forzar recálculo"""
-        result = super().write(vals)
+        """
+        Al modificar estado, forzar recálculo. Reactivar un hold (o moverlo
+        de quant) choca con el índice único igual que en create, y se
+        traduce al mismo mensaje.
+        """
+        if 'estado' in vals or 'quant_id' in vals:
+            quant_ids = self.quant_id.ids + ([vals['quant_id']] if vals.get('quant_id') else [])
+            if vals.get('estado', 'activo') == 'activo':
+                self._expirar_vencidos(quant_ids)
+            try:
+                with self.env.cr.savepoint(flush=False):
+                    result = super().write(vals)
+                    self.flush_recordset()
+            except psycopg2.errors.UniqueViolation as e:
+                if e.diag.constraint_name != self._UNIQUE_HOLD_ACTIVO_INDEX:
+                    raise
+                self._raise_hold_existente(quant_ids)
+        else:
+            result = super().write(vals)
+        self.env['stock.quant']._invalidar_cache_lotes_disponibles()
         if 'estado' in vals:
             self.mapped('quant_id')._compute_estado_hold()
+        if 'fecha_inicio' in vals:
+            self._programar_expiracion(min(self.mapped('fecha_expiracion'), default=False))
         return result
\ No newline at end of file
@@ -1,11 +1,32 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import config
+from odoo.tools.image import image_process
+from odoo.tools.mimetypes import guess_mimetype
+from datetime import timedelta
+import base64
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import time
+
+_logger = logging.getLogger(__name__)
 
 class StockLotImage(models.Model):
     _name = 'stock.lot.image'
     _description = 'Fotografías de Lotes'
     _order = 'sequence, id'
 
+    # Las imágenes se guardan como ir.attachment, cuyo filestore ya está
+    # direccionado por contenido (SHA-1): subir la misma foto a varios lotes
+    # comparte un único archivo para el original y para cada versión
+    # reducida, y el recolector del filestore solo borra el archivo cuando
+    # ningún adjunto lo referencia. El checksum permite además localizar
+    # las fotos idénticas entre lotes.
+
     name = fields.Char(
         string='Nombre',
         required=True,
@@ -32,10 +53,49 @@ class StockLotImage(models.Model):
         attachment=True
     )
     
-    image_small = fields.Binary(
+    checksum = fields.Char(
+        string='Checksum',
+        readonly=True,
+        index=True,
+        copy=False,
+        help='SHA-1 del contenido de la imagen original'
+    )
+    
+    # Versiones reducidas (adjuntos). Las genera en segundo plano el cron
+    # de procesamiento (_cron_procesar_imagenes) a partir del original, con
+    # orientación EXIF corregida y recompresión JPEG. Las vistas y widgets
+    # usan la más pequeña que cubra el tamaño mostrado.
+    image_1920 = fields.Image(
+        string='Imagen (1920px)',
+        readonly=True
+    )
+    
+    image_512 = fields.Image(
+        string='Imagen (512px)',
+        readonly=True
+    )
+    
+    image_128 = fields.Image(
+        string='Imagen (128px)',
+        readonly=True
+    )
+    
+    estado_procesamiento = fields.Selection([
+        ('pendiente', 'Pendiente'),
+        ('procesado', 'Procesado'),
+        ('error', 'Error'),
+    ], string='Procesamiento', default='procesado', required=True, index=True, readonly=True,
+       help='Estado de la generación de versiones reducidas en segundo plano')
+    
+    error_procesamiento = fields.Char(
+        string='Error de Procesamiento',
+        readonly=True
+    )
+    
+    image_small = fields.Image(
         string='Miniatura',
-        compute='_compute_image_small',
-        store=True
+        related='image_128',
+        help='Alias de la miniatura de 128px'
     )
     
     fecha_captura = fields.Datetime(
@@ -47,13 +107,349 @@ class StockLotImage(models.Model):
     notas = fields.Text(
         string='Notas'
     )
+    
+    archivado = fields.Boolean(
+        string='Original Archivado',
+        readonly=True,
+        index=True,
+        copy=False,
+        help='El original está en el almacenamiento frío; solo las versiones '
+             'reducidas siguen en línea'
+    )
+    
+    fecha_archivado = fields.Datetime(
+        string='Fecha de Archivado',
+        readonly=True,
+        copy=False
+    )
+
+    @api.model
+    def _get_checksum(self, image):
+        """SHA-1 del contenido binario de una imagen en base64"""
+        if not image:
+            return False
+        return hashlib.sha1(base64.b64decode(image)).hexdigest()
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Guardar solo el original; las versiones reducidas se encolan"""
+        for vals in vals_list:
+            if 'image' in vals:
+                vals['estado_procesamiento'] = 'pendiente'
+                if 'checksum' not in vals:
+                    vals['checksum'] = self._get_checksum(vals['image'])
+        images = super().create(vals_list)
+        images._encolar_procesamiento()
+        return images
+
+    def write(self, vals):
+        if 'image' in vals:
+            vals = dict(
+                vals,
+                checksum=self._get_checksum(vals['image']),
+                estado_procesamiento='pendiente',
+                error_procesamiento=False,
+            )
+        result = super().write(vals)
+        if 'image' in vals:
+            self._encolar_procesamiento()
+        return result
+
+    # ------------------------------------------------------------------
+    # COLA DE PROCESAMIENTO EN SEGUNDO PLANO
+    # ------------------------------------------------------------------
+    # Tamaño máximo (lado mayor) de cada versión reducida
+    _RENDICIONES = {
+        'image_1920': 1920,
+        'image_512': 512,
+        'image_128': 128,
+    }
+
+    def _encolar_procesamiento(self):
+        """Despertar al cron de procesamiento en cuanto termine la transacción"""
+        if not self:
+            return
+        cron = self.env.ref('stock_lot_dimensions.ir_cron_procesar_imagenes_lotes', raise_if_not_found=False)
+        if cron:
+            cron.sudo()._trigger()
+
+    @api.model
+    def _get_calidad_jpeg(self):
+        """Calidad JPEG de las versiones reducidas (parámetro de sistema)"""
+        return int(self.env['ir.config_parameter'].sudo().get_param(
+            'stock_lot_dimensions.image_quality', 85
+        ))
+
+    def _procesar_imagen(self):
+        """Generar las versiones reducidas con orientación EXIF corregida"""
+        self.ensure_one()
+        original = base64.b64decode(self.image)
+        calidad = self._get_calidad_jpeg()
+        vals = {}
+        for campo, tamano in self._RENDICIONES.items():
+            # image_process aplica la orientación EXIF antes de redimensionar
+            vals[campo] = base64.b64encode(image_process(
+                original,
+                size=(tamano, tamano),
+                quality=calidad,
+                output_format='JPEG',
+            ))
+        vals.update(estado_procesamiento='procesado', error_procesamiento=False)
+        self.write(vals)
+
+    @api.model
+    def _cron_procesar_imagenes(self, batch_size=20, time_limit=240, auto_commit=True):
+        """
+        Cron de la cola de imágenes: procesa las fotografías pendientes en
+        lotes pequeños con commit tras cada lote, marca como error las que
+        no se pueden procesar y notifica al cron lo que queda pendiente.
+        """
+        inicio = time.monotonic()
+        domain = [('estado_procesamiento', '=', 'pendiente')]
+        procesadas = 0
+        
+        while time.monotonic() - inicio < time_limit:
+            images = self.search(domain, limit=batch_size, order='id')
+            if not images:
+                break
+            for image in images:
+                try:
+                    with self.env.cr.savepoint():
+                        image._procesar_imagen()
+                except Exception as e:
+                    _logger.warning("No se pudo procesar la imagen %s: %s", image.id, e)
+                    image.write({
+                        'estado_procesamiento': 'error',
+                        'error_procesamiento': str(e)[:255],
+                    })
+            procesadas += len(images)
+            if auto_commit:
+                self.env.cr.commit()
+        
+        restantes = self.search_count(domain)
+        self.env['ir.cron']._notify_progress(done=procesadas, remaining=restantes)
+        return procesadas
+
+    @api.model
+    def _crear_adjunto_desde_archivo(self, ruta, name, res_model=False, res_id=False):
+        """
+        Crear un ir.attachment a partir de un archivo en disco sin cargarlo
+        en memoria: el SHA-1 se calcula por bloques y el archivo se mueve
+        tal cual al filestore (direccionado por contenido). Si el
+        almacenamiento de adjuntos es la base de datos no hay forma de
+        evitar leerlo completo.
+        """
+        Attachment = self.env['ir.attachment'].sudo()
+        vals = {'name': name, 'type': 'binary', 'res_model': res_model, 'res_id': res_id}
+        if Attachment._storage() != 'file':
+            with open(ruta, 'rb') as origen:
+                return Attachment.create(dict(vals, raw=origen.read()))
+        
+        sha1 = hashlib.sha1()
+        with open(ruta, 'rb') as origen:
+            cabecera = origen.read(1024)
+            sha1.update(cabecera)
+            for bloque in iter(lambda: origen.read(1024 * 1024), b''):
+                sha1.update(bloque)
+        checksum = sha1.hexdigest()
+        tamano = os.path.getsize(ruta)
+        
+        fname = f'{checksum[:2]}/{checksum}'
+        destino = Attachment._full_path(fname)
+        if not os.path.exists(destino):
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            shutil.move(ruta, destino + '.tmp')
+            os.replace(destino + '.tmp', destino)
+            # Si la transacción se revierte, el recolector borra el archivo
+            Attachment._mark_for_gc(fname)
+        return Attachment.create(dict(
+            vals,
+            store_fname=fname,
+            file_size=tamano,
+            checksum=checksum,
+            mimetype=guess_mimetype(cabecera),
+        ))
 
-    @api.depends('image')
-    def _compute_image_small(self):
-        """Generar miniatura de la imagen"""
-        for record in self:
-            if record.image:
-                # Odoo maneja automáticamente el redimensionamiento
-                record.image_small = record.image
+    @api.model
+    def _crear_desde_adjunto(self, lotes, adjunto, vals=None):
+        """
+        Crear una fotografía por lote con el contenido de ``adjunto``. El
+        adjunto pasa a ser el original de la primera y las demás reciben
+        copias que comparten el mismo archivo del filestore, sin leer ni
+        volver a codificar la imagen.
+        """
+        images = self.create([dict(
+            vals or {},
+            lot_id=lote.id,
+            checksum=adjunto.checksum,
+            estado_procesamiento='pendiente',
+        ) for lote in lotes])
+        adjunto = adjunto.sudo()
+        for image in images:
+            destino = {'res_model': self._name, 'res_field': 'image', 'res_id': image.id}
+            if image == images[0]:
+                adjunto.write(destino)
             else:
-                record.image_small = False
+                adjunto.copy(destino)
+        images.invalidate_recordset(['image'])
+        return images
+
+    @api.model
+    def _crear_desde_archivo(self, lot, ruta, name):
+        """
+        Crear una fotografía a partir de un archivo en disco (subida por
+        trozos en multipart, sin base64 en la red ni en memoria): el
+        archivo va directo al filestore y el adjunto se enlaza al registro.
+        """
+        adjunto = self._crear_adjunto_desde_archivo(ruta, name)
+        return self._crear_desde_adjunto(lot, adjunto, {'name': name})
+
+    def action_reprocesar(self):
+        """Volver a encolar las imágenes seleccionadas"""
+        self.write({'estado_procesamiento': 'pendiente', 'error_procesamiento': False})
+        self._encolar_procesamiento()
+        return True
+
+    # ------------------------------------------------------------------
+    # ALMACENAMIENTO FRÍO DE ORIGINALES
+    # ------------------------------------------------------------------
+    @api.model
+    def _get_ruta_almacen_frio(self):
+        """
+        Directorio del almacenamiento frío (parámetro de sistema
+        ``stock_lot_dimensions.cold_storage_path``; por defecto
+        <data_dir>/cold_storage/<base de datos>). Debe quedar fuera del
+        filestore para no entrar en los respaldos diarios.
+        """
+        ruta = self.env['ir.config_parameter'].sudo().get_param('stock_lot_dimensions.cold_storage_path')
+        return ruta or os.path.join(config['data_dir'], 'cold_storage', self.env.cr.dbname)
+
+    def _get_ruta_archivo_frio(self):
+        self.ensure_one()
+        if not self.checksum:
+            raise UserError(f'La fotografía "{self.name}" no tiene checksum: no hay copia en el almacenamiento frío.')
+        return os.path.join(self._get_ruta_almacen_frio(), self.checksum[:2], f'{self.checksum}.gz')
+
+    def _get_adjuntos_original(self):
+        return self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'image'),
+            ('res_id', 'in', self.ids),
+        ])
+
+    def _archivar_original(self):
+        """Mover el original comprimido al almacenamiento frío y liberar el adjunto"""
+        adjuntos = {adjunto.res_id: adjunto for adjunto in self._get_adjuntos_original()}
+        archivadas = self.browse()
+        for image in self:
+            adjunto = adjuntos.get(image.id)
+            if not adjunto:
+                continue
+            if not image.checksum:
+                # El checksum del adjunto es el mismo SHA-1 del contenido
+                image.checksum = adjunto.checksum
+            ruta = image._get_ruta_archivo_frio()
+            # Direccionado por contenido: las fotos idénticas comparten archivo frío
+            try:
+                if not os.path.exists(ruta):
+                    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+                    with gzip.open(ruta + '.tmp', 'wb') as destino:
+                        destino.write(adjunto.raw)
+                    os.replace(ruta + '.tmp', ruta)
+            except OSError:
+                _logger.exception("No se pudo copiar al almacenamiento frío la fotografía %s", image.id)
+                continue
+            archivadas |= image
+        
+        # El recolector del filestore borra el archivo cuando ya nadie lo usa
+        self.env['ir.attachment'].sudo().browse(
+            [adjuntos[image.id].id for image in archivadas]
+        ).unlink()
+        archivadas.write({'archivado': True, 'fecha_archivado': fields.Datetime.now()})
+        return archivadas
+
+    def action_restaurar_original(self):
+        """Recuperar el original desde el almacenamiento frío"""
+        Attachment = self.env['ir.attachment'].sudo()
+        for image in self.filtered('archivado'):
+            ruta = image._get_ruta_archivo_frio()
+            if not os.path.exists(ruta):
+                raise UserError(f'No se encontró el original archivado de "{image.name}" ({ruta}).')
+            with gzip.open(ruta, 'rb') as origen:
+                Attachment.create({
+                    'name': image.name,
+                    'res_model': self._name,
+                    'res_field': 'image',
+                    'res_id': image.id,
+                    'raw': origen.read(),
+                })
+            image.invalidate_recordset(['image'])
+        self.write({'archivado': False, 'fecha_archivado': False})
+        return True
+
+    @api.model
+    def _cron_archivar_originales(self, dias=None, batch_size=200, time_limit=240, auto_commit=True):
+        """
+        Archivar los originales de lotes sin existencias cuyo último
+        movimiento realizado tiene más de ``dias`` días (parámetro
+        ``stock_lot_dimensions.cold_storage_days``, 180 por defecto).
+        """
+        if dias is None:
+            dias = int(self.env['ir.config_parameter'].sudo().get_param(
+                'stock_lot_dimensions.cold_storage_days', 180
+            ))
+        limite = fields.Datetime.now() - timedelta(days=dias)
+        
+        # Lotes con existencias en ubicaciones internas: no se archivan
+        con_existencias = {
+            lot.id for lot, _cantidad in self.env['stock.quant']._read_group(
+                [('lot_id', '!=', False), ('location_id.usage', '=', 'internal'), ('quantity', '>', 0)],
+                groupby=['lot_id'],
+                aggregates=['quantity:sum'],
+            )
+        }
+        # Lotes cuyo último movimiento realizado es anterior al límite
+        lotes = [
+            lot.id for lot, ultima_fecha in self.env['stock.move.line']._read_group(
+                [('lot_id', '!=', False), ('state', '=', 'done')],
+                groupby=['lot_id'],
+                aggregates=['date:max'],
+            )
+            if ultima_fecha and ultima_fecha < limite and lot.id not in con_existencias
+        ]
+        
+        domain = [
+            ('lot_id', 'in', lotes),
+            ('archivado', '=', False),
+            ('estado_procesamiento', '=', 'procesado'),
+        ]
+        inicio = time.monotonic()
+        archivadas = 0
+        # Las que no se pudieron archivar (sin original o copia fallida) no se
+        # marcan: se omiten en esta ejecución y se reintentan en la siguiente
+        omitidas = []
+        while time.monotonic() - inicio < time_limit:
+            images = self.search(domain + [('id', 'not in', omitidas)], limit=batch_size, order='id')
+            if not images:
+                break
+            hechas = images._archivar_original()
+            omitidas += (images - hechas).ids
+            archivadas += len(hechas)
+            if auto_commit:
+                self.env.cr.commit()
+        
+        restantes = self.search_count(domain + [('id', 'not in', omitidas)])
+        _logger.info("Almacenamiento frío: %s originales archivados, %s pendientes", archivadas, restantes)
+        self.env['ir.cron']._notify_progress(done=archivadas, remaining=restantes)
+        return archivadas
+
+    def action_view_duplicadas(self):
+        """Ver todas las fotografías con el mismo contenido en otros lotes"""
+        self.ensure_one()
+        return {
+            'name': f'Fotografías idénticas a {self.name}',
+            'type': 'ir.actions.act_window',
+            'res_model': 'stock.lot.image',
+            'view_mode': 'kanban,list,form',
+            'domain': [('checksum', '=', self.checksum)],
+        }
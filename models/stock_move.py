@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+
+
+class StockMove(models.Model):
+    _inherit = 'stock.move'
+
+    def write(self, vals):
+        """
+        Al cambiar el estado del movimiento (asignar, validar, cancelar)
+        cambia el estado "En Orden de Entrega" de los quants de sus líneas.
+        """
+        result = super().write(vals)
+        if 'state' in vals:
+            self.env['stock.quant']._recalcular_estado_entrega(self.move_line_ids)
+        return result
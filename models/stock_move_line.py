@@ -1,12 +1,18 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
+from collections import defaultdict
 import logging
 
+from ..tools.tracing import traced
+
 _logger = logging.getLogger(__name__)
 
 class StockMoveLine(models.Model):
     _inherit = 'stock.move.line'
 
+    # Campos que cambian el estado "En Orden de Entrega" de los quants
+    _CAMPOS_ESTADO_ENTREGA = ('lot_id', 'location_id', 'picking_id', 'move_id')
+
     # Campos temporales para captura en recepción
     x_grosor_temp = fields.Float(
         string='Grosor (cm)',
@@ -119,6 +125,13 @@ class StockMoveLine(models.Model):
         store=False
     )
     
+    x_fotografia_principal_url_lote = fields.Char(
+        related='lot_id.x_fotografia_principal_url',
+        string='URL Foto Lote',
+        readonly=True,
+        store=False
+    )
+    
     x_cantidad_fotos_lote = fields.Integer(
         related='lot_id.x_cantidad_fotos',
         string='# Fotos Lote',
@@ -132,213 +145,115 @@ class StockMoveLine(models.Model):
         for line in self:
             line.x_is_incoming = line.picking_id and line.picking_id.picking_type_code == 'incoming'
 
+    def _get_cliente_entrega(self):
+        """Cliente de la entrega: el de la orden de venta si existe, si no el del picking"""
+        self.ensure_one()
+        if self.move_id and self.move_id.sale_line_id:
+            return self.move_id.sale_line_id.order_id.partner_id
+        return self.picking_id.partner_id
+
+    @traced
     def _get_lotes_disponibles_ids(self):
         """
-        🔍 FILTRADO DE LOTES - CON DEPURACIÓN COMPLETA
+        🔍 FILTRADO DE LOTES
+
+        Lotes del producto en la ubicación con cantidad > 0, excluyendo los que
+        tienen hold activo para otro cliente. La resolución la hace
+        stock.quant._get_lotes_disponibles_cliente (una sola consulta, memoizada
+        por transacción).
         """
         self.ensure_one()
         
-        _logger.info("🔵"*50)
-        _logger.info("🔵 [FILTRO LOTES] _get_lotes_disponibles_ids() INICIANDO")
-        _logger.info("🔵 [FILTRO LOTES] Move Line ID: %s", self.id)
-        
         # Solo aplicar filtro en pickings de salida (entregas)
-        if not self.picking_id:
-            _logger.warning("🔵 [FILTRO LOTES] ❌ NO HAY PICKING - Retornando lista vacía")
-            return []
-            
-        if self.picking_id.picking_type_code != 'outgoing':
-            _logger.info("🔵 [FILTRO LOTES] ⏭️ Picking NO es outgoing (es: %s) - No filtrar", 
-                        self.picking_id.picking_type_code)
+        if not self.picking_id or self.picking_id.picking_type_code != 'outgoing':
             return []
         
-        _logger.info("🔵 [FILTRO LOTES] ✅ Picking es OUTGOING: %s", self.picking_id.name)
-        
-        # Obtener el cliente del picking
-        cliente_picking = self.picking_id.partner_id
-        _logger.info("🔵 [FILTRO LOTES] Cliente del picking: %s (ID: %s)", 
-                    cliente_picking.name if cliente_picking else 'SIN CLIENTE',
-                    cliente_picking.id if cliente_picking else 'N/A')
+        cliente_picking = self._get_cliente_entrega()
         
-        if self.move_id and self.move_id.sale_line_id:
-            cliente_picking = self.move_id.sale_line_id.order_id.partner_id
-            _logger.info("🔵 [FILTRO LOTES] ✅ Cliente actualizado desde sale_line_id: %s (ID: %s)", 
-                        cliente_picking.name, cliente_picking.id)
-        
-        if not cliente_picking:
-            _logger.warning("🔵 [FILTRO LOTES] ❌ NO HAY CLIENTE - Retornando lista vacía")
-            return []
-            
-        if not self.product_id:
-            _logger.warning("🔵 [FILTRO LOTES] ❌ NO HAY PRODUCTO - Retornando lista vacía")
-            return []
-            
-        if not self.location_id:
-            _logger.warning("🔵 [FILTRO LOTES] ❌ NO HAY UBICACIÓN - Retornando lista vacía")
+        if not cliente_picking or not self.product_id or not self.location_id:
             return []
         
-        _logger.info("🔵 [FILTRO LOTES] Producto: %s (ID: %s)", self.product_id.name, self.product_id.id)
-        _logger.info("🔵 [FILTRO LOTES] Ubicación: %s (ID: %s)", self.location_id.name, self.location_id.id)
-        
-        # Buscar todos los quants del producto en la ubicación
-        quants = self.env['stock.quant'].search([
-            ('product_id', '=', self.product_id.id),
-            ('location_id', '=', self.location_id.id),
-            ('quantity', '>', 0),
-        ])
-        
-        _logger.info("🔵 [FILTRO LOTES] Total quants encontrados: %s", len(quants))
-        
-        # Filtrar lotes válidos
-        lotes_validos = []
-        
-        for quant in quants:
-            if quant.lot_id:
-                lote_nombre = quant.lot_id.name
-                lote_id = quant.lot_id.id
-                tiene_hold = quant.x_tiene_hold
-                
-                _logger.info("🔵 [FILTRO LOTES] ─────────────────────────────────────")
-                _logger.info("🔵 [FILTRO LOTES] Analizando Lote: %s (ID: %s)", lote_nombre, lote_id)
-                _logger.info("🔵 [FILTRO LOTES] Cantidad: %.2f", quant.quantity)
-                _logger.info("🔵 [FILTRO LOTES] Tiene Hold: %s", tiene_hold)
-                
-                # CASO 1: Sin hold → Disponible para TODOS
-                if not tiene_hold:
-                    _logger.info("🔵 [FILTRO LOTES] ✅ SIN HOLD - Agregando a lista válida")
-                    lotes_validos.append(lote_id)
-                    continue
-                
-                # CASO 2: Con hold → Verificar para quién es
-                if quant.x_hold_activo_id:
-                    hold_partner = quant.x_hold_activo_id.partner_id
-                    hold_partner_id = hold_partner.id if hold_partner else None
-                    hold_partner_name = hold_partner.name if hold_partner else 'SIN CLIENTE'
-                    
-                    _logger.info("🔵 [FILTRO LOTES] Hold encontrado:")
-                    _logger.info("🔵 [FILTRO LOTES]   - Partner Hold: %s (ID: %s)", 
-                                hold_partner_name, hold_partner_id)
-                    _logger.info("🔵 [FILTRO LOTES]   - Partner Picking: %s (ID: %s)", 
-                                cliente_picking.name, cliente_picking.id)
-                    
-                    if hold_partner_id == cliente_picking.id:
-                        _logger.info("🔵 [FILTRO LOTES] ✅ HOLD PARA ESTE CLIENTE - Agregando a lista válida")
-                        lotes_validos.append(lote_id)
-                    else:
-                        _logger.warning("🔵 [FILTRO LOTES] ❌ HOLD PARA OTRO CLIENTE - NO agregando")
-                        _logger.warning("🔵 [FILTRO LOTES]    Este lote NO debe aparecer en la lista")
-                else:
-                    _logger.warning("🔵 [FILTRO LOTES] ⚠️ Tiene hold pero sin x_hold_activo_id - NO agregando")
-        
-        _logger.info("🔵 [FILTRO LOTES] ═════════════════════════════════════════")
-        _logger.info("🔵 [FILTRO LOTES] RESUMEN FINAL:")
-        _logger.info("🔵 [FILTRO LOTES] Total quants analizados: %s", len(quants))
-        _logger.info("🔵 [FILTRO LOTES] Lotes válidos encontrados: %s", len(lotes_validos))
-        _logger.info("🔵 [FILTRO LOTES] IDs de lotes válidos: %s", lotes_validos)
-        _logger.info("🔵 [FILTRO LOTES] _get_lotes_disponibles_ids() FINALIZADO")
-        _logger.info("🔵"*50)
-        
-        return lotes_validos
+        return self.env['stock.quant']._get_lotes_disponibles_cliente(
+            self.product_id.id, self.location_id.id, cliente_picking.id
+        )
 
     @api.constrains('lot_id', 'picking_id')
+    @traced
     def _check_lot_hold(self):
         """
-        🔒 CONSTRAINT - Validación SQL que se ejecuta SIEMPRE
+        🔒 CONSTRAINT - Validación que se ejecuta SIEMPRE
         
         Esta validación se ejecuta automáticamente cuando:
         - Se crea un move_line con lot_id
         - Se modifica el lot_id de un move_line existente
         - Se intenta guardar cambios
         
-        NO se puede bypasear - es una restricción a nivel de base de datos
+        Valida todo el recordset de una vez: una sola búsqueda de holds activos
+        para todas las combinaciones (lote, ubicación, producto) y un único
+        error con todos los lotes bloqueados.
         """
         from odoo.exceptions import ValidationError
         
-        for line in self:
-            # Solo validar si hay lote asignado y es un picking de salida
-            if line.lot_id and line.picking_id and line.picking_id.picking_type_code == 'outgoing':
-                _logger.info("🔒"*50)
-                _logger.info("🔒 [CONSTRAINT] _check_lot_hold() EJECUTADO")
-                _logger.info("🔒 [CONSTRAINT] Move Line ID: %s", line.id)
-                _logger.info("🔒 [CONSTRAINT] Lote: %s (ID: %s)", line.lot_id.name, line.lot_id.id)
-                _logger.info("🔒 [CONSTRAINT] Picking: %s", line.picking_id.name)
-                
-                # Obtener el cliente del picking
-                cliente_picking = line.picking_id.partner_id
-                if line.move_id and line.move_id.sale_line_id:
-                    cliente_picking = line.move_id.sale_line_id.order_id.partner_id
-                
-                if cliente_picking:
-                    _logger.info("🔒 [CONSTRAINT] Cliente: %s (ID: %s)", 
-                                cliente_picking.name, cliente_picking.id)
-                    
-                    # Buscar el quant del lote
-                    quant = self.env['stock.quant'].search([
-                        ('lot_id', '=', line.lot_id.id),
-                        ('location_id', '=', line.location_id.id),
-                        ('product_id', '=', line.product_id.id)
-                    ], limit=1)
-                    
-                    if quant:
-                        _logger.info("🔒 [CONSTRAINT] Quant encontrado - Tiene hold: %s", 
-                                    quant.x_tiene_hold)
-                        
-                        # Si tiene hold, verificar que sea para este cliente
-                        if quant.x_tiene_hold and quant.x_hold_activo_id:
-                            hold_partner = quant.x_hold_activo_id.partner_id
-                            
-                            _logger.info("🔒 [CONSTRAINT] Hold para: %s (ID: %s)", 
-                                        hold_partner.name, hold_partner.id)
-                            
-                            # Si el hold NO es para este cliente, BLOQUEAR
-                            if hold_partner.id != cliente_picking.id:
-                                _logger.error("🔒 [CONSTRAINT] ❌❌❌ BLOQUEANDO - Hold para otro cliente")
-                                _logger.info("🔒"*50)
-                                
-                                raise ValidationError(
-                                    f"🔒 NO PUEDE USAR ESTE LOTE\n\n"
-                                    f"El lote '{line.lot_id.name}' está RESERVADO para:\n"
-                                    f"👤 {hold_partner.name}\n"
-                                    f"📅 Hasta: {quant.x_hold_expira.strftime('%d/%m/%Y %H:%M')}\n"
-                                    f"⏱️ Días restantes: {quant.x_hold_dias_restantes}\n\n"
-                                    f"❌ Esta entrega es para '{cliente_picking.name}'\n\n"
-                                    f"Por favor, seleccione un lote disponible.\n"
-                                    f"Los lotes apartados para otros clientes no aparecen en la lista."
-                                )
-                            else:
-                                _logger.info("🔒 [CONSTRAINT] ✅ Hold es para este cliente")
-                        else:
-                            _logger.info("🔒 [CONSTRAINT] ✅ Lote sin hold")
-                    else:
-                        _logger.warning("🔒 [CONSTRAINT] ⚠️ No se encontró quant")
-                else:
-                    _logger.warning("🔒 [CONSTRAINT] ⚠️ No hay cliente en picking")
-                
-                _logger.info("🔒"*50)
+        # Solo validar si hay lote asignado y es un picking de salida
+        lines = self.filtered(
+            lambda l: l.lot_id and l.picking_id and l.picking_id.picking_type_code == 'outgoing'
+        )
+        if not lines:
+            return
+        
+        holds = self.env['stock.lot.hold'].search(self.env['stock.lot.hold']._get_domain_vigente() + [
+            ('lot_id', 'in', lines.lot_id.ids),
+            ('ubicacion_id', 'in', lines.location_id.ids),
+            ('producto_id', 'in', lines.product_id.ids),
+        ])
+        holds_por_clave = {}
+        for hold in holds:
+            holds_por_clave.setdefault(
+                (hold.lot_id.id, hold.ubicacion_id.id, hold.producto_id.id), hold
+            )
+        if not holds_por_clave:
+            return
+        
+        bloqueados = []
+        for line in lines:
+            hold = holds_por_clave.get((line.lot_id.id, line.location_id.id, line.product_id.id))
+            if not hold:
+                continue
+            cliente_picking = line._get_cliente_entrega()
+            # Si el hold NO es para este cliente, BLOQUEAR
+            if cliente_picking and hold.partner_id != cliente_picking:
+                bloqueados.append(
+                    f"• '{line.lot_id.name}' reservado para 👤 {hold.partner_id.name} "
+                    f"hasta 📅 {hold.fecha_expiracion.strftime('%d/%m/%Y %H:%M')} "
+                    f"(entrega para '{cliente_picking.name}')"
+                )
+        
+        if bloqueados:
+            raise ValidationError(
+                "🔒 NO PUEDE USAR ESTOS LOTES\n\n"
+                "Los siguientes lotes están RESERVADOS para otro cliente:\n"
+                + "\n".join(bloqueados)
+                + "\n\nPor favor, seleccione lotes disponibles.\n"
+                "Los lotes apartados para otros clientes no aparecen en la lista."
+            )
 
     @api.onchange('product_id', 'location_id', 'picking_id')
     def _onchange_product_location_filter_lots(self):
         """
         🎨 ONCHANGE - Filtrar lotes cuando el usuario cambia producto/ubicación
         """
-        _logger.info("🟢"*50)
-        _logger.info("🟢 [ONCHANGE] _onchange_product_location_filter_lots() EJECUTADO")
-        
         if not self.product_id or not self.picking_id:
-            _logger.info("🟢 [ONCHANGE] Sin producto o picking - retornando {}")
             return {}
         
         # Solo aplicar filtro en pickings de salida (entregas)
         if self.picking_id.picking_type_code != 'outgoing':
-            _logger.info("🟢 [ONCHANGE] Picking NO es outgoing - retornando {}")
             return {}
         
-        _logger.info("🟢 [ONCHANGE] Llamando a _get_lotes_disponibles_ids()...")
         lotes_validos = self._get_lotes_disponibles_ids()
         
         # Retornar dominio que filtra los lotes
         if lotes_validos:
-            domain_result = {
+            return {
                 'domain': {
                     'lot_id': [
                         ('id', 'in', lotes_validos),
@@ -346,19 +261,11 @@ class StockMoveLine(models.Model):
                     ]
                 }
             }
-            _logger.info("🟢 [ONCHANGE] ✅ Retornando dominio con %s lotes", len(lotes_validos))
-            _logger.info("🟢 [ONCHANGE] Dominio: %s", domain_result)
-            _logger.info("🟢"*50)
-            return domain_result
-        else:
-            domain_result = {
-                'domain': {
-                    'lot_id': [('id', '=', False)]
-                }
+        return {
+            'domain': {
+                'lot_id': [('id', '=', False)]
             }
-            _logger.info("🟢 [ONCHANGE] ⚠️ NO HAY LOTES VÁLIDOS - Retornando dominio vacío")
-            _logger.info("🟢"*50)
-            return domain_result
+        }
 
     @api.onchange('lot_id')
     def _onchange_lot_id_dimensions(self):
@@ -377,8 +284,8 @@ class StockMoveLine(models.Model):
             if self.picking_id:
                 if self.picking_id.picking_type_code == 'incoming':
                     # RECEPCIÓN: Calcular por dimensiones
-                    if self.lot_id.x_alto and self.lot_id.x_ancho:
-                        self.qty_done = self.lot_id.x_alto * self.lot_id.x_ancho
+                    if self.lot_id.x_area:
+                        self.quantity = self.lot_id.x_area
                 
                 elif self.picking_id.picking_type_code == 'outgoing':
                     # ENTREGA: Buscar cantidad disponible del lote
@@ -392,100 +299,65 @@ class StockMoveLine(models.Model):
                         cantidad_disponible = quant.available_quantity
                         if cantidad_disponible > 0:
                             if self.move_id and self.move_id.product_uom_qty:
-                                self.qty_done = min(cantidad_disponible, self.move_id.product_uom_qty)
+                                self.quantity = min(cantidad_disponible, self.move_id.product_uom_qty)
                             else:
-                                self.qty_done = cantidad_disponible
+                                self.quantity = cantidad_disponible
                         else:
-                            self.qty_done = 0.0
+                            self.quantity = 0.0
                     else:
-                        self.qty_done = 0.0
+                        self.quantity = 0.0
 
     @api.onchange('x_alto_temp', 'x_ancho_temp')
     def _onchange_calcular_cantidad(self):
-        """Calcular automáticamente qty_done (m²) cuando se ingresan alto y ancho"""
+        """Calcular automáticamente la cantidad (m²) cuando se ingresan alto y ancho"""
         if self.picking_id and self.picking_id.picking_type_code == 'incoming':
             if self.x_alto_temp and self.x_ancho_temp:
-                self.qty_done = self.x_alto_temp * self.x_ancho_temp
+                self.quantity = self.x_alto_temp * self.x_ancho_temp
 
+    @traced
     def write(self, vals):
         """Guardar dimensiones en el lote al confirmar (solo en recepciones)"""
         from odoo.exceptions import UserError
         
-        _logger.info("🟣"*50)
-        _logger.info("🟣 [WRITE] write() EJECUTADO en stock.move.line")
-        _logger.info("🟣 [WRITE] vals: %s", vals)
-        
         # ================================================================
         # VALIDACIÓN CRÍTICA: Si se está modificando lot_id, verificar hold
         # ================================================================
         if 'lot_id' in vals and vals['lot_id']:
-            _logger.info("🟣 [WRITE] ⚠️ Detectado cambio de lot_id a: %s", vals['lot_id'])
-            
             for line in self:
                 # Solo validar en pickings de salida (entregas)
-                if line.picking_id and line.picking_id.picking_type_code == 'outgoing':
-                    _logger.info("🟣 [WRITE] Picking es OUTGOING - Validando hold")
-                    _logger.info("🟣 [WRITE] Picking: %s", line.picking_id.name)
-                    
-                    # Obtener el cliente del picking
-                    cliente_picking = line.picking_id.partner_id
-                    if line.move_id and line.move_id.sale_line_id:
-                        cliente_picking = line.move_id.sale_line_id.order_id.partner_id
-                    
-                    if cliente_picking:
-                        _logger.info("🟣 [WRITE] Cliente picking: %s (ID: %s)", 
-                                    cliente_picking.name, cliente_picking.id)
-                        
-                        # Buscar el quant del lote que se intenta asignar
+                if not line.picking_id or line.picking_id.picking_type_code != 'outgoing':
+                    continue
+                
+                cliente_picking = line._get_cliente_entrega()
+                if not cliente_picking:
+                    continue
+                
+                # Buscar el quant del lote que se intenta asignar
+                quant = self.env['stock.quant'].search([
+                    ('lot_id', '=', vals['lot_id']),
+                    ('location_id', '=', line.location_id.id),
+                    ('product_id', '=', line.product_id.id)
+                ], limit=1)
+                
+                # Si tiene hold para otro cliente, BLOQUEAR
+                if quant and quant.x_tiene_hold and quant.x_hold_activo_id and quant.x_hold_expira > fields.Datetime.now():
+                    hold_partner = quant.x_hold_activo_id.partner_id
+                    if hold_partner.id != cliente_picking.id:
                         new_lot = self.env['stock.lot'].browse(vals['lot_id'])
-                        _logger.info("🟣 [WRITE] Nuevo lote a asignar: %s (ID: %s)", 
-                                    new_lot.name, new_lot.id)
-                        
-                        quant = self.env['stock.quant'].search([
-                            ('lot_id', '=', vals['lot_id']),
-                            ('location_id', '=', line.location_id.id),
-                            ('product_id', '=', line.product_id.id)
-                        ], limit=1)
-                        
-                        if quant:
-                            _logger.info("🟣 [WRITE] Quant encontrado - ID: %s", quant.id)
-                            _logger.info("🟣 [WRITE] Tiene hold: %s", quant.x_tiene_hold)
-                            
-                            # Si tiene hold, verificar que sea para este cliente
-                            if quant.x_tiene_hold and quant.x_hold_activo_id:
-                                hold_partner = quant.x_hold_activo_id.partner_id
-                                _logger.info("🟣 [WRITE] Hold partner: %s (ID: %s)", 
-                                            hold_partner.name, hold_partner.id)
-                                
-                                # Si el hold NO es para este cliente, BLOQUEAR
-                                if hold_partner.id != cliente_picking.id:
-                                    _logger.error("🟣 [WRITE] ❌❌❌ BLOQUEANDO WRITE!")
-                                    _logger.error("🟣 [WRITE] Lote tiene hold para otro cliente")
-                                    
-                                    raise UserError(
-                                        f"🔒 NO PUEDE ASIGNAR ESTE LOTE\n\n"
-                                        f"El lote '{new_lot.name}' está RESERVADO para:\n"
-                                        f"👤 {hold_partner.name}\n"
-                                        f"📅 Hasta: {quant.x_hold_expira.strftime('%d/%m/%Y %H:%M')}\n"
-                                        f"⏱️ Días restantes: {quant.x_hold_dias_restantes}\n\n"
-                                        f"❌ Esta entrega es para '{cliente_picking.name}'\n\n"
-                                        f"Por favor, seleccione un lote disponible de la lista."
-                                    )
-                                else:
-                                    _logger.info("🟣 [WRITE] ✅ Hold es para este cliente - Permitiendo")
-                            else:
-                                _logger.info("🟣 [WRITE] ✅ No tiene hold - Permitiendo")
-                        else:
-                            _logger.warning("🟣 [WRITE] ⚠️ No se encontró quant para este lote")
-                    else:
-                        _logger.warning("🟣 [WRITE] ⚠️ No hay cliente en el picking")
-                else:
-                    if line.picking_id:
-                        _logger.info("🟣 [WRITE] Picking NO es outgoing (es: %s) - No validar", 
-                                    line.picking_id.picking_type_code)
-        
-        _logger.info("🟣 [WRITE] ✅ Validaciones pasadas - Ejecutando super().write()")
-        _logger.info("🟣"*50)
+                        raise UserError(
+                            f"🔒 NO PUEDE ASIGNAR ESTE LOTE\n\n"
+                            f"El lote '{new_lot.name}' está RESERVADO para:\n"
+                            f"👤 {hold_partner.name}\n"
+                            f"📅 Hasta: {quant.x_hold_expira.strftime('%d/%m/%Y %H:%M')}\n"
+                            f"⏱️ Días restantes: {quant.x_hold_dias_restantes}\n\n"
+                            f"❌ Esta entrega es para '{cliente_picking.name}'\n\n"
+                            f"Por favor, seleccione un lote disponible de la lista."
+                        )
+        
+        # Quants de los lotes/ubicaciones anteriores (si cambian, también se recalculan)
+        cambia_estado_entrega = any(field in vals for field in self._CAMPOS_ESTADO_ENTREGA)
+        if cambia_estado_entrega:
+            self.env['stock.quant']._recalcular_estado_entrega(self)
         
         # Primero ejecutar el write original
         result = super().write(vals)
@@ -496,34 +368,23 @@ class StockMoveLine(models.Model):
         
         # Si se modificó el lote_id o hay dimensiones, actualizar el lote
         if 'lot_id' in vals or has_dimensions:
-            for line in self:
-                if line.lot_id and line.picking_id and line.picking_id.picking_type_code == 'incoming':
-                    lot_vals = {}
-                    
-                    if line.x_grosor_temp:
-                        lot_vals['x_grosor'] = line.x_grosor_temp
-                    if line.x_alto_temp:
-                        lot_vals['x_alto'] = line.x_alto_temp
-                    if line.x_ancho_temp:
-                        lot_vals['x_ancho'] = line.x_ancho_temp
-                    if line.x_bloque_temp:
-                        lot_vals['x_bloque'] = line.x_bloque_temp
-                    if line.x_atado_temp:
-                        lot_vals['x_atado'] = line.x_atado_temp
-                    if line.x_formato_temp:
-                        lot_vals['x_formato'] = line.x_formato_temp
-                    
-                    if lot_vals:
-                        line.lot_id.write(lot_vals)
+            self._escribir_dimensiones_en_lotes()
+        
+        if cambia_estado_entrega:
+            self.env['stock.quant']._recalcular_estado_entrega(self)
         
-        # Calcular qty_done si se modifican alto o ancho
-        if ('x_alto_temp' in vals or 'x_ancho_temp' in vals) and 'qty_done' not in vals:
+        # Calcular la cantidad si se modifican alto o ancho
+        if ('x_alto_temp' in vals or 'x_ancho_temp' in vals) and 'quantity' not in vals:
+            lineas_por_cantidad = defaultdict(lambda: self.env['stock.move.line'])
             for line in self:
                 if line.picking_id and line.picking_id.picking_type_code == 'incoming':
                     alto = line.x_alto_temp
                     ancho = line.x_ancho_temp
                     if alto and ancho:
-                        super(StockMoveLine, line).write({'qty_done': alto * ancho})
+                        lineas_por_cantidad[alto * ancho] |= line
+            # Un solo write por cada cantidad distinta
+            for cantidad, lineas in lineas_por_cantidad.items():
+                super(StockMoveLine, lineas).write({'quantity': cantidad})
         
         return result
 
@@ -535,30 +396,55 @@ class StockMoveLine(models.Model):
             if picking_id:
                 picking = self.env['stock.picking'].browse(picking_id)
                 if picking.picking_type_code == 'incoming':
-                    if vals.get('x_alto_temp') and vals.get('x_ancho_temp'):
-                        vals['qty_done'] = vals['x_alto_temp'] * vals['x_ancho_temp']
+                    if vals.get('x_alto_temp') and vals.get('x_ancho_temp') and not vals.get('quantity'):
+                        vals['quantity'] = vals['x_alto_temp'] * vals['x_ancho_temp']
         
         lines = super().create(vals_list)
+        lines._escribir_dimensiones_en_lotes()
+        self.env['stock.quant']._recalcular_estado_entrega(lines)
         
-        for line, vals in zip(lines, vals_list):
+        return lines
+
+    def unlink(self):
+        """Recalcular el estado de entrega de los quants de las líneas eliminadas"""
+        self.env['stock.quant']._recalcular_estado_entrega(self)
+        return super().unlink()
+
+    def _get_lot_vals_dimensiones(self):
+        """Valores de dimensiones capturados en la línea que se guardan en el lote"""
+        self.ensure_one()
+        lot_vals = {}
+        if self.x_grosor_temp:
+            lot_vals['x_grosor'] = self.x_grosor_temp
+        if self.x_alto_temp:
+            lot_vals['x_alto'] = self.x_alto_temp
+        if self.x_ancho_temp:
+            lot_vals['x_ancho'] = self.x_ancho_temp
+        if self.x_bloque_temp:
+            lot_vals['x_bloque'] = self.x_bloque_temp
+        if self.x_atado_temp:
+            lot_vals['x_atado'] = self.x_atado_temp
+        if self.x_formato_temp:
+            lot_vals['x_formato'] = self.x_formato_temp
+        return lot_vals
+
+    def _escribir_dimensiones_en_lotes(self):
+        """
+        Guardar en los lotes las dimensiones de las líneas de recepción.
+
+        Los lotes que reciben exactamente los mismos valores se agrupan en un
+        solo write, de modo que un contenedor de cientos de placas del mismo
+        bloque/formato no dispara un write (y sus recálculos) por placa.
+        """
+        lotes_por_vals = defaultdict(lambda: self.env['stock.lot'])
+        for line in self:
             if line.lot_id and line.picking_id and line.picking_id.picking_type_code == 'incoming':
-                lot_vals = {}
-                
-                if line.x_grosor_temp:
-                    lot_vals['x_grosor'] = line.x_grosor_temp
-                if line.x_alto_temp:
-                    lot_vals['x_alto'] = line.x_alto_temp
-                if line.x_ancho_temp:
-                    lot_vals['x_ancho'] = line.x_ancho_temp
-                if line.x_bloque_temp:
-                    lot_vals['x_bloque'] = line.x_bloque_temp
-                if line.x_formato_temp:
-                    lot_vals['x_formato'] = line.x_formato_temp
-                
+                lot_vals = line._get_lot_vals_dimensiones()
                 if lot_vals:
-                    line.lot_id.write(lot_vals)
+                    lotes_por_vals[tuple(sorted(lot_vals.items()))] |= line.lot_id
         
-        return lines
+        for lot_vals, lotes in lotes_por_vals.items():
+            lotes.write(dict(lot_vals))
 
     def action_add_photos(self):
         """Abrir wizard para agregar fotografías al lote"""
@@ -608,6 +494,7 @@ class StockLot(models.Model):
     _inherit = 'stock.lot'
     
     @api.model
+    @traced
     def name_search(self, name='', args=None, operator='ilike', limit=100):
         """
         🔒 FILTRADO ADICIONAL - En name_search
@@ -615,60 +502,22 @@ class StockLot(models.Model):
         Este método se ejecuta cuando Odoo busca lotes para el selector.
         Aquí agregamos el filtrado de holds TAMBIÉN en la búsqueda.
         """
-        _logger.info("🟡"*50)
-        _logger.info("🟡 [NAME_SEARCH] name_search() EJECUTADO en stock.lot")
-        _logger.info("🟡 [NAME_SEARCH] name: %s", name)
-        _logger.info("🟡 [NAME_SEARCH] args: %s", args)
-        _logger.info("🟡 [NAME_SEARCH] Context: %s", self.env.context)
-        
         # Verificar si estamos en el contexto de una move_line
         move_line_id = self.env.context.get('move_line_id')
         
         if move_line_id:
-            _logger.info("🟡 [NAME_SEARCH] ✅ Contexto tiene move_line_id: %s", move_line_id)
-            
             move_line = self.env['stock.move.line'].browse(move_line_id)
             
             if move_line.picking_id and move_line.picking_id.picking_type_code == 'outgoing':
-                _logger.info("🟡 [NAME_SEARCH] ✅ Es un picking OUTGOING - Aplicando filtro")
-                
-                # Obtener cliente
-                cliente_picking = move_line.picking_id.partner_id
-                if move_line.move_id and move_line.move_id.sale_line_id:
-                    cliente_picking = move_line.move_id.sale_line_id.order_id.partner_id
+                cliente_picking = move_line._get_cliente_entrega()
                 
                 if cliente_picking:
-                    _logger.info("🟡 [NAME_SEARCH] Cliente: %s (ID: %s)", 
-                                cliente_picking.name, cliente_picking.id)
-                    
-                    # Buscar quants válidos
-                    domain = [
-                        ('product_id', '=', move_line.product_id.id),
-                        ('location_id', '=', move_line.location_id.id),
-                        ('quantity', '>', 0),
-                    ]
-                    
-                    quants = self.env['stock.quant'].search(domain)
-                    _logger.info("🟡 [NAME_SEARCH] Quants encontrados: %s", len(quants))
-                    
-                    lotes_validos = []
-                    for quant in quants:
-                        if quant.lot_id:
-                            if not quant.x_tiene_hold:
-                                lotes_validos.append(quant.lot_id.id)
-                            elif quant.x_hold_activo_id and quant.x_hold_activo_id.partner_id.id == cliente_picking.id:
-                                lotes_validos.append(quant.lot_id.id)
-                    
-                    _logger.info("🟡 [NAME_SEARCH] Lotes válidos: %s", lotes_validos)
+                    lotes_validos = self.env['stock.quant']._get_lotes_disponibles_cliente(
+                        move_line.product_id.id, move_line.location_id.id, cliente_picking.id
+                    )
                     
                     # Agregar filtro a args
-                    if args is None:
-                        args = []
-                    args = list(args) + [('id', 'in', lotes_validos)]
-                    
-                    _logger.info("🟡 [NAME_SEARCH] Args actualizado: %s", args)
-        
-        _logger.info("🟡"*50)
+                    args = list(args or []) + [('id', 'in', lotes_validos)]
         
         # Llamar al método original con args posiblemente modificado
-        return super(StockLot, self).name_search(name=name, args=args, operator=operator, limit=limit)
\ No newline at end of file
+        return super(StockLot, self).name_search(name=name, args=args, operator=operator, limit=limit)
@@ -1,17 +1,22 @@
 # -*- coding: utf-8 -*-
-from odoo import models, api
+from odoo import models, fields, api
 from odoo.exceptions import UserError
+from PIL import Image, ImageDraw
+import base64
+import hashlib
+import io
 import logging
 
+from ..tools.tracing import trace_span, traced
+
 _logger = logging.getLogger(__name__)
 
 class StockPicking(models.Model):
     _inherit = 'stock.picking'
     
+    @traced
     def action_assign(self):
         """Override para filtrar quants con hold al reservar"""
-        _logger.info("🟢 [STOCK PICKING] action_assign() llamado para picking: %s", self.mapped('name'))
-        
         for picking in self:
             if picking.picking_type_code == 'outgoing' and picking.partner_id:
                 # ✅ CORRECCIÓN: Pasar el cliente permitido Y la empresa en el contexto
@@ -21,122 +26,133 @@ class StockPicking(models.Model):
                     company_id=company_id
                 )
         
-        result = super(StockPicking, self).action_assign()
-        _logger.info("🟢 [STOCK PICKING] action_assign() completado")
-        return result
+        return super(StockPicking, self).action_assign()
     
     def _action_assign(self):
         """
         Override para limpiar lotes automáticos después de la asignación
         """
-        _logger.info("="*80)
-        _logger.info("🟡 [STOCK PICKING] _action_assign() INICIANDO para picking(s): %s", self.mapped('name'))
-        
-        # Ejecutar el proceso normal de asignación
-        res = super(StockPicking, self)._action_assign()
-        _logger.info("🟡 [STOCK PICKING] Super _action_assign() completado")
-        
-        # Después de la asignación, limpiar TODOS los lotes que se asignaron automáticamente
-        for picking in self:
-            _logger.info("🟡 [STOCK PICKING] Procesando picking: %s (ID: %s)", picking.name, picking.id)
-            _logger.info("🟡 [STOCK PICKING] Sale Order: %s", picking.sale_id.name if picking.sale_id else 'No tiene sale_id')
-            _logger.info("🟡 [STOCK PICKING] Picking Type: %s", picking.picking_type_code)
-            _logger.info("🟡 [STOCK PICKING] Company: %s (ID: %s)", 
-                        picking.company_id.name if picking.company_id else 'N/A',
-                        picking.company_id.id if picking.company_id else 'N/A')
+        with trace_span(self.env, 'stock.picking._action_assign', records=len(self)) as span:
+            # Ejecutar el proceso normal de asignación
+            res = super(StockPicking, self)._action_assign()
             
-            # Verificar si este picking viene de una orden de venta
-            if picking.sale_id:
-                _logger.info("🟡 [STOCK PICKING] ✅ Picking viene de Sale Order - procediendo a limpiar lotes")
-                
-                # Buscar todas las stock.move.line de este picking
-                move_lines = self.env['stock.move.line'].search([
-                    ('picking_id', '=', picking.id)
-                ])
-                
-                _logger.info("🟡 [STOCK PICKING] Move lines encontradas: %s", len(move_lines))
-                
-                for ml in move_lines:
-                    _logger.info("🟡 [STOCK PICKING]   - Move Line ID: %s, Lote: %s, Producto: %s, Cantidad: %s, Estado: %s", 
-                                ml.id, 
-                                ml.lot_id.name if ml.lot_id else 'Sin Lote',
-                                ml.product_id.name, 
-                                ml.quantity,
-                                ml.state)
-                
-                # Limpiar los lotes de todas las líneas
-                if move_lines:
-                    _logger.info("🟡 [STOCK PICKING] ¡LIMPIANDO LOTES AHORA! Actualizando %s líneas...", len(move_lines))
-                    
-                    try:
-                        move_lines.write({
-                            'lot_id': False,
-                            'lot_name': False,
-                        })
-                        _logger.info("🟡 [STOCK PICKING] ✅ Write ejecutado exitosamente")
-                        
-                        # Forzar commit
-                        self.env.cr.commit()
-                        _logger.info("🟡 [STOCK PICKING] ✅ Commit ejecutado")
-                        
-                        # Verificar que se limpiaron
-                        move_lines_verificacion = self.env['stock.move.line'].search([
-                            ('picking_id', '=', picking.id)
-                        ])
-                        _logger.info("🟡 [STOCK PICKING] VERIFICACIÓN - Total líneas: %s", len(move_lines_verificacion))
-                        for ml in move_lines_verificacion:
-                            _logger.info("🟡 [STOCK PICKING] VERIFICACIÓN - Move Line ID: %s, Lote después: %s", 
-                                        ml.id, ml.lot_id.name if ml.lot_id else '✅ VACÍO')
-                    except Exception as e:
-                        _logger.error("🟡 [STOCK PICKING] ❌ ERROR al limpiar lotes: %s", str(e))
-                        _logger.exception("🟡 [STOCK PICKING] Traceback completo:")
-                else:
-                    _logger.warning("🟡 [STOCK PICKING] ⚠️ No se encontraron move_lines para limpiar")
-            else:
-                _logger.info("🟡 [STOCK PICKING] ⏭️ Picking NO viene de Sale Order - saltando limpieza de lotes")
-        
-        _logger.info("🟡 [STOCK PICKING] _action_assign() FINALIZADO")
-        _logger.info("="*80)
-        return res
+            # Después de la asignación, limpiar TODOS los lotes que se asignaron
+            # automáticamente en los pickings que vienen de una orden de venta
+            pickings_venta = self.filtered('sale_id')
+            move_lines = self.env['stock.move.line'].search([
+                ('picking_id', 'in', pickings_venta.ids)
+            ]) if pickings_venta else self.env['stock.move.line']
+            span['lineas_limpiadas'] = len(move_lines)
+            
+            # Sin commit ni captura de errores: la limpieza es parte de la
+            # transacción del llamador y se revierte con ella
+            if move_lines:
+                move_lines.write({
+                    'lot_id': False,
+                    'lot_name': False,
+                })
+            return res
     
     def button_validate(self):
         """Validar holds antes de validar el picking"""
-        _logger.info("🔴 [STOCK PICKING] button_validate() iniciando para: %s", self.mapped('name'))
-        
-        for picking in self:
-            if picking.picking_type_code == 'outgoing':
+        with trace_span(self.env, 'stock.picking.button_validate', records=len(self)) as span:
+            lotes_verificados = 0
+            for picking in self:
+                if picking.picking_type_code != 'outgoing':
+                    continue
                 # ✅ CORRECCIÓN: Obtener la empresa del picking
                 company_id = picking.company_id.id if picking.company_id else self.env.company.id
-                _logger.info("🔴 [STOCK PICKING] Validando con empresa: %s (ID: %s)", 
-                            picking.company_id.name if picking.company_id else 'N/A',
-                            company_id)
                 
                 for move_line in picking.move_line_ids:
-                    if move_line.lot_id:
-                        _logger.info("🔴 [STOCK PICKING] Verificando lote: %s para move_line: %s", 
-                                    move_line.lot_id.name, move_line.id)
-                        
-                        # ✅ CORRECCIÓN: Verificar si el lote tiene hold EN LA EMPRESA CORRECTA
-                        quant = self.env['stock.quant'].search([
-                            ('lot_id', '=', move_line.lot_id.id),
-                            ('location_id', '=', move_line.location_id.id),
-                            ('company_id', '=', company_id),
-                            ('x_tiene_hold', '=', True),
-                        ], limit=1)
-                        
-                        if quant and quant.x_hold_activo_id:
-                            # Validar que el cliente coincida
-                            if picking.partner_id != quant.x_hold_activo_id.partner_id:
-                                _logger.warning("🔴 [STOCK PICKING] ⚠️ Hold encontrado para cliente diferente")
-                                raise UserError(
-                                    f"🔒 NO PUEDE VALIDAR ESTA ENTREGA\n\n"
-                                    f"El lote '{move_line.lot_id.name}' está RESERVADO para:\n"
-                                    f"👤 {quant.x_hold_para}\n"
-                                    f"📅 Hasta: {quant.x_hold_expira.strftime('%d/%m/%Y %H:%M')}\n"
-                                    f"⏱️ Días restantes: {quant.x_hold_dias_restantes}\n\n"
-                                    f"❌ Esta entrega es para '{picking.partner_id.name}'"
-                                )
+                    if not move_line.lot_id:
+                        continue
+                    lotes_verificados += 1
+                    
+                    # ✅ CORRECCIÓN: Verificar si el lote tiene hold EN LA EMPRESA CORRECTA
+                    quant = self.env['stock.quant'].search([
+                        ('lot_id', '=', move_line.lot_id.id),
+                        ('location_id', '=', move_line.location_id.id),
+                        ('company_id', '=', company_id),
+                        ('x_tiene_hold', '=', True),
+                    ], limit=1)
+                    
+                    if quant and quant.x_hold_activo_id and quant.x_hold_expira > fields.Datetime.now():
+                        # Validar que el cliente coincida
+                        if picking.partner_id != quant.x_hold_activo_id.partner_id:
+                            raise UserError(
+                                f"🔒 NO PUEDE VALIDAR ESTA ENTREGA\n\n"
+                                f"El lote '{move_line.lot_id.name}' está RESERVADO para:\n"
+                                f"👤 {quant.x_hold_para}\n"
+                                f"📅 Hasta: {quant.x_hold_expira.strftime('%d/%m/%Y %H:%M')}\n"
+                                f"⏱️ Días restantes: {quant.x_hold_dias_restantes}\n\n"
+                                f"❌ Esta entrega es para '{picking.partner_id.name}'"
+                            )
+            span['lotes_verificados'] = lotes_verificados
+            
+            return super(StockPicking, self).button_validate()
+    
+    # ------------------------------------------------------------------
+    # HOJA DE CONTACTOS DE FOTOGRAFÍAS
+    # ------------------------------------------------------------------
+    _HOJA_CELDA = 128
+    _HOJA_ETIQUETA = 16
+    _HOJA_COLUMNAS = 8
+    
+    def _get_fotos_principales(self):
+        """Lista ordenada de (lote, stock.lot.image principal o vacío) de los lotes del picking"""
+        self.ensure_one()
+        lotes = self.move_line_ids.lot_id.sorted('name')
+        fotos = self.env['stock.lot.image'].search([('lot_id', 'in', lotes.ids)], order='sequence, id')
+        principal = {}
+        for foto in fotos:
+            principal.setdefault(foto.lot_id.id, foto)
+        return [(lote, principal.get(lote.id, fotos.browse())) for lote in lotes]
+    
+    def _get_hoja_contactos_etag(self, fotos=None):
+        """ETag de la hoja: cambia si cambia algún lote o su foto principal"""
+        fotos = fotos if fotos is not None else self._get_fotos_principales()
+        firma = '|'.join(
+            f'{lote.id}:{lote.name}:{foto.id}:{foto.write_date}' for lote, foto in fotos
+        )
+        return hashlib.sha1(firma.encode()).hexdigest()
+    
+    def _render_hoja_contactos(self, fotos=None):
+        """
+        Componer en una sola imagen JPEG las miniaturas (image_128 ya
+        generadas) de la foto principal de cada lote del picking, con el
+        número de lote debajo. Permite revisar cientos de placas con una
+        única descarga.
+        """
+        fotos = fotos if fotos is not None else self._get_fotos_principales()
+        celda, etiqueta = self._HOJA_CELDA, self._HOJA_ETIQUETA
+        columnas = max(1, min(self._HOJA_COLUMNAS, len(fotos)))
+        filas = max(1, -(-len(fotos) // columnas))
+        hoja = Image.new('RGB', (columnas * celda, filas * (celda + etiqueta)), 'white')
+        dibujo = ImageDraw.Draw(hoja)
         
-        result = super(StockPicking, self).button_validate()
-        _logger.info("🔴 [STOCK PICKING] button_validate() completado")
-        return result
\ No newline at end of file
+        for indice, (lote, foto) in enumerate(fotos):
+            x = (indice % columnas) * celda
+            y = (indice // columnas) * (celda + etiqueta)
+            if foto and foto.image_128:
+                miniatura = Image.open(io.BytesIO(base64.b64decode(foto.image_128)))
+                miniatura.thumbnail((celda, celda))
+                hoja.paste(
+                    miniatura.convert('RGB'),
+                    (x + (celda - miniatura.width) // 2, y + (celda - miniatura.height) // 2),
+                )
+            else:
+                dibujo.rectangle([x + 4, y + 4, x + celda - 4, y + celda - 4], outline='#cccccc')
+            dibujo.text((x + 4, y + celda + 2), lote.name[:20], fill='black')
+        
+        salida = io.BytesIO()
+        hoja.save(salida, format='JPEG', quality=85, optimize=True)
+        return salida.getvalue()
+    
+    def action_ver_hoja_contactos(self):
+        """Abrir la hoja de contactos con las fotos de todos los lotes del picking"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/stock_lot_dimensions/picking/{self.id}/hoja_contactos',
+            'target': 'new',
+        }
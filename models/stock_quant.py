@@ -1,18 +1,21 @@
 # -*- coding: utf-8 -*-
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 import json
 
 class StockQuant(models.Model):
     _inherit = 'stock.quant'
 
     # Campos relacionados del lote
-    x_grosor = fields.Float(related='lot_id.x_grosor', string='Grosor', readonly=True)
-    x_alto = fields.Float(related='lot_id.x_alto', string='Alto', readonly=True)
-    x_ancho = fields.Float(related='lot_id.x_ancho', string='Ancho', readonly=True)
+    x_grosor = fields.Float(related='lot_id.x_grosor', string='Grosor', store=True, readonly=True)
+    x_alto = fields.Float(related='lot_id.x_alto', string='Alto', store=True, readonly=True)
+    x_ancho = fields.Float(related='lot_id.x_ancho', string='Ancho', store=True, readonly=True)
+    x_area = fields.Float(related='lot_id.x_area', string='Área (m²)', store=True, index=True, readonly=True)
+    x_volumen = fields.Float(related='lot_id.x_volumen', string='Volumen (m³)', store=True, index=True, readonly=True)
     x_bloque = fields.Char(related='lot_id.x_bloque', string='Bloque', readonly=True)
     x_atado = fields.Char(related='lot_id.x_atado', string='Atado', readonly=True)
     x_formato = fields.Selection(related='lot_id.x_formato', string='Formato', readonly=True)
     x_fotografia_principal = fields.Binary(related='lot_id.x_fotografia_principal', readonly=True)
+    x_fotografia_principal_url = fields.Char(related='lot_id.x_fotografia_principal_url', readonly=True)
     x_cantidad_fotos = fields.Integer(related='lot_id.x_cantidad_fotos', readonly=True)
     x_detalles_placa = fields.Text(related='lot_id.x_detalles_placa', string='Detalles', readonly=True)
     
@@ -31,6 +34,13 @@ class StockQuant(models.Model):
         help='Indica si el lote está en una orden de entrega confirmada'
     )
     
+    x_documento_entrega = fields.Char(
+        string='Documento de Entrega',
+        compute='_compute_estado_reserva',
+        store=True,
+        help='Referencia de la orden de entrega donde está asignado el lote'
+    )
+    
     x_tiene_detalles = fields.Boolean(
         string='Tiene Detalles',
         compute='_compute_tiene_detalles',
@@ -85,7 +95,8 @@ class StockQuant(models.Model):
     estado_placa = fields.Char(
         string='Estado Placa',
         compute='_compute_estado_placa',
-        help='Estado visual de la placa (JSON para widget)'
+        store=True,
+        help='Estado visual de la placa (JSON para widget), materializado en BD'
     )
 
     @api.depends('lot_id.x_detalles_placa')
@@ -116,37 +127,88 @@ class StockQuant(models.Model):
 
     @api.depends('reserved_quantity', 'quantity', 'lot_id')
     def _compute_estado_reserva(self):
-        """Computar si el lote está reservado por el sistema de entregas"""
+        """Computar si el lote está reservado por el sistema de entregas.
+
+        Se resuelve en modo conjunto: una sola consulta agrupada por
+        (lote, ubicación) sobre las move lines de salida asignadas para
+        todos los quants reservados del recordset.
+        """
+        quants_reservados = self.filtered(lambda q: q.lot_id and q.reserved_quantity > 0)
+        en_entrega = self._get_lotes_en_orden_entrega(quants_reservados)
+
         for quant in self:
             # Solo verificar si hay cantidad reservada por el sistema
             quant.x_esta_reservado = quant.reserved_quantity > 0
-            
+
             # Verificar si está en una orden de entrega confirmada
-            quant.x_en_orden_entrega = False
-            
-            if quant.lot_id and quant.x_esta_reservado:
-                # Buscar move lines con este lote en estado asignado
-                move_lines = self.env['stock.move.line'].search([
-                    ('lot_id', '=', quant.lot_id.id),
-                    ('location_id', '=', quant.location_id.id),
-                    ('state', 'in', ['assigned', 'partially_available']),
-                    ('picking_id.picking_type_code', '=', 'outgoing'),
-                ], limit=1)
-                
-                if move_lines:
-                    quant.x_en_orden_entrega = True
+            documento = en_entrega.get((quant.lot_id.id, quant.location_id.id)) if quant.x_esta_reservado else False
+            quant.x_en_orden_entrega = bool(documento)
+            quant.x_documento_entrega = documento or False
+
+    @api.model
+    def _get_lotes_en_orden_entrega(self, quants):
+        """
+        Devuelve un diccionario {(lot_id, location_id): nombre del picking} con
+        los quants dados que tienen move lines de salida en estado asignado o
+        parcialmente disponible.
+        """
+        if not quants:
+            return {}
+
+        grupos = self.env['stock.move.line']._read_group(
+            [
+                ('lot_id', 'in', quants.lot_id.ids),
+                ('location_id', 'in', quants.location_id.ids),
+                ('state', 'in', ['assigned', 'partially_available']),
+                ('picking_id.picking_type_code', '=', 'outgoing'),
+            ],
+            groupby=['lot_id', 'location_id', 'picking_id'],
+            aggregates=['__count'],
+        )
+        en_entrega = {}
+        for lot, location, picking, _count in grupos:
+            en_entrega.setdefault((lot.id, location.id), picking.name)
+        return en_entrega
+
+    @api.model
+    def _recalcular_estado_entrega(self, move_lines):
+        """
+        Marcar para recálculo el estado de entrega (y el JSON de estado) de
+        los quants de los lotes/ubicaciones de las move lines dadas.
+
+        x_en_orden_entrega y x_documento_entrega dependen de move lines y del
+        estado de sus movimientos, que no son alcanzables desde el quant con
+        un @api.depends; stock.move.line y stock.move llaman a este método
+        cuando cambian las líneas o el estado.
+        """
+        move_lines = move_lines.filtered('lot_id')
+        if not move_lines:
+            return
+        quants = self.sudo().search([
+            ('lot_id', 'in', move_lines.lot_id.ids),
+            ('location_id', 'in', move_lines.location_id.ids),
+        ])
+        for fname in ('x_esta_reservado', 'x_en_orden_entrega', 'x_documento_entrega', 'estado_placa'):
+            self.env.add_to_compute(self._fields[fname], quants)
 
     @api.depends(
         'x_esta_reservado',
-        'x_en_orden_entrega', 
+        'x_en_orden_entrega',
+        'x_documento_entrega',
         'x_tiene_detalles',
-        'x_detalles_placa',
+        'lot_id.x_detalles_placa',
         'x_tiene_hold',
         'x_hold_para',
-        'x_hold_dias_restantes'
+        'x_hold_expira'
     )
     def _compute_estado_placa(self):
-        """Generar JSON con los estados para el widget visual"""
+        """
+        Generar JSON con los estados para el widget visual.
+
+        Se guarda en BD y solo se recalcula cuando cambian holds, reservas o
+        detalles. Los días restantes del hold los calcula el widget a partir
+        de la fecha de expiración para no depender de la hora del cálculo.
+        """
         for quant in self:
             estados = []
             
@@ -156,37 +218,36 @@ class StockQuant(models.Model):
                     'type': 'hold',
                     'icon': '🔒',
                     'label': f'HOLD para {quant.x_hold_para}',
-                    'detail': f'Expira en {quant.x_hold_dias_restantes} días',
-                    'class': 'text-warning' if quant.x_hold_dias_restantes <= 3 else 'text-info'
+                    'expira': fields.Datetime.to_string(quant.x_hold_expira) if quant.x_hold_expira else False,
                 })
             
             # RESERVA DEL SISTEMA (solo si no tiene hold manual)
-            elif quant.x_esta_reservado and quant.x_en_orden_entrega:
-                # Obtener el documento de referencia
-                move_line = self.env['stock.move.line'].search([
-                    ('lot_id', '=', quant.lot_id.id),
-                    ('location_id', '=', quant.location_id.id),
-                    ('state', 'in', ['assigned', 'partially_available']),
-                    ('picking_id.picking_type_code', '=', 'outgoing'),
-                ], limit=1)
-                
-                if move_line:
-                    estados.append({
-                        'type': 'delivery',
-                        'icon': '📦',
-                        'label': 'En Orden de Entrega',
-                        'detail': f'Doc: {move_line.picking_id.name}',
-                        'class': 'text-primary'
-                    })
+            elif quant.x_en_orden_entrega:
+                estados.append({
+                    'type': 'delivery',
+                    'icon': '📦',
+                    'label': 'En Orden de Entrega',
+                    'detail': f'Doc: {quant.x_documento_entrega}',
+                    'class': 'text-primary'
+                })
+            elif quant.x_esta_reservado:
+                estados.append({
+                    'type': 'reserved',
+                    'icon': '✋',
+                    'label': 'Reservado',
+                    'class': 'text-success'
+                })
             
             # DETALLES ESPECIALES
             if quant.x_tiene_detalles:
-                detalles_cortos = quant.x_detalles_placa[:30] + '...' if len(quant.x_detalles_placa) > 30 else quant.x_detalles_placa
+                detalles = quant.lot_id.x_detalles_placa
+                detalles_cortos = detalles[:30] + '...' if len(detalles) > 30 else detalles
                 estados.append({
                     'type': 'details',
                     'icon': '⚠️',
                     'label': 'Detalles Especiales',
                     'detail': detalles_cortos,
+                    'full': detalles,
                     'class': 'text-danger'
                 })
             
@@ -219,7 +280,7 @@ class StockQuant(models.Model):
             'name': f'Fotografías del Lote {self.lot_id.name}',
             'type': 'ir.actions.act_window',
             'res_model': 'stock.lot.image',
-            'view_mode': 'tree,form',
+            'view_mode': 'list,form',
             'domain': [('lot_id', '=', self.lot_id.id)],
             'context': {
                 'default_lot_id': self.lot_id.id,
@@ -286,12 +347,183 @@ class StockQuant(models.Model):
             }
         }
 
+    def init(self):
+        """Índice compuesto para la búsqueda de placas por medidas"""
+        super().init()
+        tools.create_index(
+            self._cr,
+            'stock_quant_dimensiones_idx',
+            self._table,
+            ['x_grosor', 'x_alto', 'x_ancho'],
+            where='lot_id IS NOT NULL AND quantity > 0',
+        )
+
+    # ------------------------------------------------------------------
+    # BÚSQUEDA DE PLACAS POR MEDIDAS
+    # ------------------------------------------------------------------
+    @api.model
+    def _buscar_placas_por_dimensiones(self, alto_min=0.0, ancho_min=0.0, alto_max=0.0, ancho_max=0.0,
+                                       grosor=0.0, tolerancia=0.0, tolerancia_grosor=0.0, rotar=True,
+                                       product_id=False, location_id=False, partner_id=False, limit=None):
+        """
+        Placas disponibles (sin reservar y sin hold vigente de otro cliente)
+        en ubicaciones internas cuyas medidas cubren alto_min x ancho_min,
+        opcionalmente acotadas por alto_max x ancho_max.
+
+        - ``tolerancia`` (m) relaja los mínimos y amplía los máximos.
+        - ``grosor`` (cm) filtra por espesor ± ``tolerancia_grosor``.
+        - ``rotar`` permite girar la placa 90° (alto y ancho intercambiados).
+
+        Se resuelve con una sola consulta sobre los valores almacenados
+        (índice ``stock_quant_dimensiones_idx``) y se ordena por desperdicio,
+        es decir, por el área sobrante respecto a la pieza solicitada.
+        Devuelve un recordset de stock.quant en ese orden.
+        """
+        self.flush_model(['lot_id', 'location_id', 'product_id', 'company_id', 'quantity',
+                          'reserved_quantity', 'x_grosor', 'x_alto', 'x_ancho', 'x_area'])
+        self.env['stock.lot.hold'].flush_model(['quant_id', 'partner_id', 'estado', 'fecha_expiracion'])
+        
+        alto_min = max((alto_min or 0.0) - tolerancia, 0.0)
+        ancho_min = max((ancho_min or 0.0) - tolerancia, 0.0)
+        alto_max = alto_max and alto_max + tolerancia
+        ancho_max = ancho_max and ancho_max + tolerancia
+        
+        def _cabe(col_alto, col_ancho):
+            condicion = [f'q.{col_alto} >= %s', f'q.{col_ancho} >= %s']
+            params = [alto_min, ancho_min]
+            if alto_max:
+                condicion.append(f'q.{col_alto} <= %s')
+                params.append(alto_max)
+            if ancho_max:
+                condicion.append(f'q.{col_ancho} <= %s')
+                params.append(ancho_max)
+            return '(' + ' AND '.join(condicion) + ')', params
+        
+        where_cabe, params_cabe = _cabe('x_alto', 'x_ancho')
+        if rotar:
+            where_rotada, params_rotada = _cabe('x_ancho', 'x_alto')
+            where_cabe = f'({where_cabe} OR {where_rotada})'
+            params_cabe += params_rotada
+        
+        where = [
+            'q.lot_id IS NOT NULL',
+            'q.quantity > 0',
+            'q.quantity > q.reserved_quantity',
+            "l.usage = 'internal'",
+            'q.company_id = ANY(%s)',
+            where_cabe,
+            """NOT EXISTS (
+                SELECT 1
+                  FROM stock_lot_hold h
+                 WHERE h.quant_id = q.id
+                   AND h.estado = 'activo'
+                   AND h.fecha_expiracion > %s
+                   AND h.partner_id IS DISTINCT FROM %s
+            )""",
+        ]
+        params = [self.env.companies.ids] + params_cabe + [fields.Datetime.now(), partner_id or None]
+        if grosor:
+            where.append('q.x_grosor BETWEEN %s AND %s')
+            params += [grosor - tolerancia_grosor, grosor + tolerancia_grosor]
+        if product_id:
+            where.append('q.product_id = %s')
+            params.append(product_id)
+        if location_id:
+            where.append('l.parent_path LIKE %s')
+            params.append(self.env['stock.location'].browse(location_id).parent_path + '%')
+        
+        query = f"""
+            SELECT q.id
+              FROM stock_quant q
+              JOIN stock_location l ON l.id = q.location_id
+             WHERE {' AND '.join(where)}
+          ORDER BY q.x_area - %s, q.id
+        """
+        params.append(alto_min * ancho_min)
+        if limit:
+            query += ' LIMIT %s'
+            params.append(limit)
+        self.env.cr.execute(query, params)
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    # ------------------------------------------------------------------
+    # RESOLUCIÓN DE LOTES DISPONIBLES (consciente de holds)
+    # ------------------------------------------------------------------
+    _LOTES_DISPONIBLES_CACHE_KEY = 'stock_lot_dimensions.lotes_disponibles'
+
+    @api.model
+    def _get_lotes_disponibles_cliente(self, product_id, location_id, partner_id):
+        """
+        Devuelve los IDs de lotes del producto en la ubicación con cantidad > 0
+        que no tienen un hold activo y vigente para otro cliente.
+
+        Se resuelve con una sola consulta (quants + holds activos) y se
+        memoiza por (producto, ubicación, cliente) durante la transacción,
+        de forma que un onchange seguido de un name_search reutiliza el
+        resultado. Cualquier cambio en holds o en la cantidad, lote o
+        ubicación de los quants invalida la caché.
+        """
+        cache = self._get_cache_lotes_disponibles()
+        key = (product_id, location_id, partner_id)
+        if key not in cache:
+            self.flush_model(['product_id', 'location_id', 'lot_id', 'quantity'])
+            self.env['stock.lot.hold'].flush_model(['quant_id', 'partner_id', 'estado', 'fecha_expiracion'])
+            self.env.cr.execute("""
+                SELECT DISTINCT q.lot_id
+                  FROM stock_quant q
+                 WHERE q.product_id = %s
+                   AND q.location_id = %s
+                   AND q.quantity > 0
+                   AND q.lot_id IS NOT NULL
+                   AND NOT EXISTS (
+                        SELECT 1
+                          FROM stock_lot_hold h
+                         WHERE h.quant_id = q.id
+                           AND h.estado = 'activo'
+                           AND h.fecha_expiracion > %s
+                           AND h.partner_id != %s
+                   )
+            """, (product_id, location_id, fields.Datetime.now(), partner_id))
+            cache[key] = [row[0] for row in self.env.cr.fetchall()]
+        return list(cache[key])
+
+    @api.model
+    def _get_cache_lotes_disponibles(self):
+        """Caché de lotes disponibles ligada al cursor (se limpia en commit/rollback)"""
+        cr = self.env.cr
+        cache = cr.cache.get(self._LOTES_DISPONIBLES_CACHE_KEY)
+        if cache is None:
+            cache = cr.cache[self._LOTES_DISPONIBLES_CACHE_KEY] = {}
+            cr.postcommit.add(self._invalidar_cache_lotes_disponibles)
+            cr.postrollback.add(self._invalidar_cache_lotes_disponibles)
+        return cache
+
+    @api.model
+    def _invalidar_cache_lotes_disponibles(self):
+        """Descartar la caché de lotes disponibles de la transacción actual"""
+        self.env.cr.cache.pop(self._LOTES_DISPONIBLES_CACHE_KEY, None)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        quants = super().create(vals_list)
+        self._invalidar_cache_lotes_disponibles()
+        return quants
+
+    def write(self, vals):
+        if {'quantity', 'lot_id', 'location_id', 'product_id'} & set(vals):
+            self._invalidar_cache_lotes_disponibles()
+        return super().write(vals)
+
+    def unlink(self):
+        self._invalidar_cache_lotes_disponibles()
+        return super().unlink()
+
     def _get_available_quantity(self, product_id, location_id, lot_id=None, package_id=None, owner_id=None, strict=False, allow_negative=False):
         """
         ✅ CORRECCIÓN COMPLETA del método _get_available_quantity con soporte multi-empresa
         
-        Este método se llama sobre un RECORDSET de múltiples quants.
-        Debe filtrar correctamente los holds considerando la empresa.
+        La cantidad bloqueada por holds se obtiene del agregado de holds activos
+        por (producto, ubicación, empresa, cliente), sin recorrer los quants.
         """
         # Llamar al método padre para obtener la cantidad base disponible
         available_qty = super(StockQuant, self)._get_available_quantity(
@@ -308,22 +540,12 @@ class StockQuant(models.Model):
         # ✅ CORRECCIÓN: Obtener la empresa del contexto o la empresa actual
         company_id = self._context.get('company_id', self.env.company.id)
         
-        # Iterar sobre los quants de este recordset y restar cantidades bloqueadas por holds
-        cantidad_bloqueada = 0.0
-        
-        for quant in self:
-            # ✅ CORRECCIÓN: Solo procesar quants de la empresa correcta
-            if quant.company_id.id != company_id:
-                continue
-            
-            # Verificar si este quant tiene un hold activo
-            if quant.x_tiene_hold and quant.x_hold_activo_id:
-                # Si hay un cliente permitido y es el mismo del hold, este quant NO está bloqueado
-                if cliente_permitido_id and quant.x_hold_activo_id.partner_id.id == cliente_permitido_id:
-                    continue  # Este quant está disponible para este cliente
-                
-                # Si no hay cliente permitido o es diferente, bloquear este quant
-                cantidad_bloqueada += quant.quantity
+        # Cantidad bloqueada por holds activos de otros clientes (un solo SUM agregado)
+        cantidad_bloqueada = self.env['stock.lot.hold'].sudo()._get_cantidad_bloqueada(
+            product_id, location_id, company_id,
+            lot_id=lot_id, package_id=package_id, owner_id=owner_id,
+            partner_id=cliente_permitido_id, strict=strict,
+        )
         
         # Retornar la cantidad disponible menos la cantidad bloqueada por holds
-        return max(0.0, available_qty - cantidad_bloqueada)
\ No newline at end of file
+        return max(0.0, available_qty - cantidad_bloqueada)
@@ -1,57 +1,97 @@
 /** @odoo-module **/
 
 import { registry } from "@web/core/registry";
-import { Component, useState } from "@odoo/owl";
+import { Component, useState, onWillStart } from "@odoo/owl";
 import { useService } from "@web/core/utils/hooks";
 
+const PAGE_SIZE = 40;
+
 export class ImageGalleryWidget extends Component {
     setup() {
         this.orm = useService("orm");
         this.action = useService("action");
         this.state = useState({
             images: [],
+            total: 0,
             currentIndex: 0,
             showModal: false,
         });
-        this.loadImages();
+        onWillStart(() => this.loadImages());
+    }
+
+    get lotId() {
+        return this.props.record.resId;
+    }
+
+    get hasMore() {
+        return this.state.images.length < this.state.total;
     }
 
     async loadImages() {
-        if (this.props.value) {
-            const lotId = this.props.value;
-            const images = await this.orm.searchRead(
-                "stock.lot.image",
-                [["lot_id", "=", lotId]],
-                ["id", "name", "image", "sequence"],
-                { order: "sequence, id" }
-            );
-            this.state.images = images;
+        // Solo metadatos: las imágenes se piden por URL cuando se muestran
+        if (!this.lotId) {
+            return;
         }
+        const domain = [["lot_id", "=", this.lotId]];
+        const [images, total] = await Promise.all([
+            this.orm.searchRead(
+                "stock.lot.image",
+                domain,
+                ["id", "name", "sequence", "write_date", "estado_procesamiento"],
+                { order: "sequence, id", limit: PAGE_SIZE, offset: this.state.images.length }
+            ),
+            this.state.total ? this.state.total : this.orm.searchCount("stock.lot.image", domain),
+        ]);
+        this.state.images.push(...images);
+        this.state.total = total;
     }
 
     openGallery(index) {
         this.state.currentIndex = index;
         this.state.showModal = true;
+        this.prefetchNeighbours();
     }
 
     closeGallery() {
         this.state.showModal = false;
     }
 
-    nextImage() {
+    async nextImage() {
+        if (this.state.currentIndex === this.state.images.length - 1 && this.hasMore) {
+            await this.loadImages();
+        }
         if (this.state.currentIndex < this.state.images.length - 1) {
             this.state.currentIndex++;
+            this.prefetchNeighbours();
         }
     }
 
     prevImage() {
         if (this.state.currentIndex > 0) {
             this.state.currentIndex--;
+            this.prefetchNeighbours();
+        }
+    }
+
+    prefetchNeighbours() {
+        // Descargar en segundo plano la anterior y la siguiente
+        for (const index of [this.state.currentIndex - 1, this.state.currentIndex + 1]) {
+            const image = this.state.images[index];
+            if (image) {
+                new Image().src = this.getImageUrl(image);
+            }
         }
     }
 
-    getImageUrl(imageId) {
-        return `/web/image/stock.lot.image/${imageId}/image`;
+    getImageUrl(image, field = "image_1920") {
+        // image_128 para miniaturas, image_1920 para la vista ampliada.
+        // Mientras el cron no genera las versiones reducidas se usa el original.
+        // El parámetro unique permite la caché de larga duración del navegador.
+        if (image.estado_procesamiento !== "procesado") {
+            field = "image";
+        }
+        const unique = (image.write_date || "").replace(/\D/g, "");
+        return `/web/image/stock.lot.image/${image.id}/${field}?unique=${unique}`;
     }
 }
 
@@ -1,10 +1,14 @@
 /** @odoo-module **/
 
 import { registry } from "@web/core/registry";
-import { Component, useState, onWillStart } from "@odoo/owl";
-import { useService } from "@web/core/utils/hooks";
+import { Component, useState } from "@odoo/owl";
+import { standardFieldProps } from "@web/views/fields/standard_field_props";
 
 export class ImagePreviewWidget extends Component {
+    static template = "stock_lot_dimensions.ImagePreviewWidget";
+    static props = { ...standardFieldProps };
+    static supportedTypes = ["char"];
+
     setup() {
         this.state = useState({
             showModal: false,
@@ -12,11 +16,13 @@ export class ImagePreviewWidget extends Component {
     }
 
     get imageUrl() {
-        if (!this.props.value) {
-            return null;
-        }
-        // El valor viene como base64, lo convertimos a data URL
-        return `data:image/png;base64,${this.props.value}`;
+        // El valor es la URL de la miniatura (/web/image/...image_128?unique=...),
+        // el navegador la descarga en diferido y la reutiliza desde su caché
+        return this.props.record.data[this.props.name] || null;
+    }
+
+    get fullImageUrl() {
+        return this.imageUrl && this.imageUrl.replace("/image_128", "/image_1920");
     }
 
     openPreview(ev) {
@@ -24,7 +30,7 @@ export class ImagePreviewWidget extends Component {
         ev.stopPropagation();
         ev.preventDefault();
         
-        if (this.props.value) {
+        if (this.imageUrl) {
             this.state.showModal = true;
         }
     }
@@ -34,8 +40,7 @@ export class ImagePreviewWidget extends Component {
     }
 }
 
-ImagePreviewWidget.template = "stock_lot_dimensions.ImagePreviewWidget";
-
-registry.category("fields").add("image_preview_clickable", {
+registry.category("fields").add("lot_photo_preview", {
     component: ImagePreviewWidget,
-});
\ No newline at end of file
+    supportedTypes: ["char"],
+});
@@ -0,0 +1,125 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+import { Component, useState } from "@odoo/owl";
+import { standardFieldProps } from "@web/views/fields/standard_field_props";
+import { useService } from "@web/core/utils/hooks";
+
+/**
+ * Carga de fotografías que reduce y recomprime la imagen en el navegador
+ * antes de enviarla (tablets en el patio con Wi-Fi débil). El lado mayor y
+ * la calidad JPEG se configuran con las opciones del widget
+ * (max_edge, quality). Si el registro tiene ``conservar_original`` marcado
+ * se envía el archivo tal cual.
+ *
+ * El archivo se sube en binario por multipart, en trozos, a
+ * /stock_lot_dimensions/upload, que lo deja como adjunto pendiente; el
+ * campo (many2one a ir.attachment) recibe el adjunto y la fotografía del
+ * lote se crea al confirmar el wizard.
+ */
+export class PhotoUploadWidget extends Component {
+    static template = "stock_lot_dimensions.PhotoUploadWidget";
+    static props = {
+        ...standardFieldProps,
+        maxEdge: { type: Number, optional: true },
+        quality: { type: Number, optional: true },
+    };
+    static defaultProps = {
+        maxEdge: 1920,
+        quality: 0.85,
+    };
+    static CHUNK_SIZE = 1024 * 1024;
+
+    setup() {
+        this.notification = useService("notification");
+        this.state = useState({ procesando: false, info: "" });
+    }
+
+    get value() {
+        return this.props.record.data[this.props.name];
+    }
+
+    get previewUrl() {
+        return this.value ? `/web/image/${this.value.id}` : null;
+    }
+
+    get conservarOriginal() {
+        return Boolean(this.props.record.data.conservar_original);
+    }
+
+    async onFileChange(ev) {
+        const file = ev.target.files && ev.target.files[0];
+        if (!file) {
+            return;
+        }
+        this.state.procesando = true;
+        try {
+            const blob = this.conservarOriginal ? file : await this.reducir(file);
+            const adjunto = await this.subir(blob, file.name);
+            await this.props.record.update({
+                [this.props.name]: { id: adjunto.id, display_name: adjunto.display_name },
+            });
+            this.state.info = `${this.formatSize(file.size)} → ${this.formatSize(blob.size)}`;
+        } catch (error) {
+            this.notification.add(error.message || "No se pudo subir la imagen seleccionada.", {
+                type: "danger",
+            });
+        } finally {
+            this.state.procesando = false;
+            ev.target.value = "";
+        }
+    }
+
+    async reducir(file) {
+        // createImageBitmap aplica la orientación EXIF antes de dibujar
+        const bitmap = await createImageBitmap(file, { imageOrientation: "from-image" });
+        const escala = Math.min(1, this.props.maxEdge / Math.max(bitmap.width, bitmap.height));
+        const canvas = document.createElement("canvas");
+        canvas.width = Math.round(bitmap.width * escala);
+        canvas.height = Math.round(bitmap.height * escala);
+        canvas.getContext("2d").drawImage(bitmap, 0, 0, canvas.width, canvas.height);
+        bitmap.close();
+        const blob = await new Promise((resolve) => canvas.toBlob(resolve, "image/jpeg", this.props.quality));
+        // Si la recompresión no ahorra nada se envía el original
+        return blob && blob.size < file.size ? blob : file;
+    }
+
+    async subir(blob, filename) {
+        const uploadId = Array.from(crypto.getRandomValues(new Uint8Array(16)), (b) =>
+            b.toString(16).padStart(2, "0")
+        ).join("");
+        const chunkSize = this.constructor.CHUNK_SIZE;
+        const totalChunks = Math.max(1, Math.ceil(blob.size / chunkSize));
+        let respuesta;
+        for (let index = 0; index < totalChunks; index++) {
+            const form = new FormData();
+            form.append("csrf_token", odoo.csrf_token);
+            form.append("upload_id", uploadId);
+            form.append("chunk_index", index);
+            form.append("total_chunks", totalChunks);
+            form.append("name", this.props.record.data.name || filename);
+            form.append("ufile", blob.slice(index * chunkSize, (index + 1) * chunkSize), filename);
+            const response = await fetch("/stock_lot_dimensions/upload", { method: "POST", body: form });
+            respuesta = await response.json();
+            if (!response.ok || respuesta.error) {
+                throw new Error(respuesta.error || "No se pudo subir la imagen seleccionada.");
+            }
+        }
+        return respuesta;
+    }
+
+    formatSize(bytes) {
+        return bytes > 1024 * 1024
+            ? `${(bytes / 1024 / 1024).toFixed(1)} MB`
+            : `${Math.round(bytes / 1024)} KB`;
+    }
+}
+
+registry.category("fields").add("lot_photo_upload", {
+    component: PhotoUploadWidget,
+    supportedTypes: ["many2one"],
+    extractProps: ({ options }) => ({
+        maxEdge: options.max_edge,
+        quality: options.quality,
+    }),
+});
@@ -13,19 +13,30 @@ export class StatusIconsWidget extends Component {
     }
 
     get estados() {
-        const data = this.props.record.data;
-        return {
-            reservado: data.x_esta_reservado || false,
-            entrega: data.x_en_orden_entrega || false,
-            detalles: data.x_tiene_detalles || false,
-            textoDetalles: data.x_detalles_placa || 'Sin detalles'
-        };
+        // El estado ya viene materializado en BD como JSON (campo estado_placa)
+        const raw = this.props.record.data[this.props.name];
+        if (!raw) {
+            return [];
+        }
+        try {
+            return JSON.parse(raw);
+        } catch {
+            return [];
+        }
     }
 
-    mostrarDetalles(ev) {
+    diasRestantes(estado) {
+        if (!estado.expira) {
+            return 0;
+        }
+        const expira = new Date(estado.expira.replace(" ", "T") + "Z");
+        return Math.floor((expira - new Date()) / 86400000);
+    }
+
+    mostrarDetalles(ev, estado) {
         ev.stopPropagation();
         ev.preventDefault();
-        this.notification.add(this.estados.textoDetalles, {
+        this.notification.add(estado.full || estado.detail || "Sin detalles", {
             title: "Detalles de la Placa",
             type: "info",
         });
@@ -34,4 +45,4 @@ export class StatusIconsWidget extends Component {
 
 registry.category("fields").add("status_icons", {
     component: StatusIconsWidget,
-});
\ No newline at end of file
+});
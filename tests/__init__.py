@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+from . import test_stock_lot_hold
+from . import test_stock_lot_image_import
+from . import test_stock_picking_packing_list
+from . import test_stock_picking_slab_optimizer
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import fields
+from odoo.exceptions import ValidationError
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestStockLotHold(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.stock_location = cls.env.ref('stock.stock_location_stock')
+        cls.product = cls.env['product.product'].create({
+            'name': 'Calacatta 2cm',
+            'is_storable': True,
+            'tracking': 'lot',
+        })
+        cls.lot = cls.env['stock.lot'].create({
+            'name': 'L-0001',
+            'product_id': cls.product.id,
+            'x_grosor': 2.0,
+            'x_alto': 3.2,
+            'x_ancho': 1.6,
+        })
+        cls.env['stock.quant']._update_available_quantity(cls.product, cls.stock_location, 5.12, lot_id=cls.lot)
+        cls.quant = cls.env['stock.quant'].search([
+            ('lot_id', '=', cls.lot.id),
+            ('location_id', '=', cls.stock_location.id),
+        ])
+        cls.cliente_a = cls.env['res.partner'].create({'name': 'Cliente A'})
+        cls.cliente_b = cls.env['res.partner'].create({'name': 'Cliente B'})
+
+    def _crear_hold(self, partner):
+        return self.env['stock.lot.hold'].create({
+            'lot_id': self.lot.id,
+            'quant_id': self.quant.id,
+            'partner_id': partner.id,
+        })
+
+    def test_segundo_hold_activo_rechazado(self):
+        self._crear_hold(self.cliente_a)
+        with self.assertRaises(ValidationError):
+            self._crear_hold(self.cliente_b)
+        self.assertEqual(self.quant.x_hold_activo_id.partner_id, self.cliente_a)
+
+    def test_hold_vencido_no_impide_nuevo(self):
+        # Vencido pero todavía activo: el cron de expiración no ha pasado
+        hold_a = self.env['stock.lot.hold'].create({
+            'lot_id': self.lot.id,
+            'quant_id': self.quant.id,
+            'partner_id': self.cliente_a.id,
+            'fecha_inicio': fields.Datetime.now() - timedelta(days=11),
+        })
+        self.assertEqual(hold_a.estado, 'activo')
+        hold_b = self._crear_hold(self.cliente_b)
+        self.assertEqual(hold_a.estado, 'expirado')
+        self.assertEqual(self.quant.x_hold_activo_id, hold_b)
+
+    def test_reactivar_hold_con_otro_activo(self):
+        hold_a = self._crear_hold(self.cliente_a)
+        hold_a.write({'estado': 'cancelado'})
+        self._crear_hold(self.cliente_b)
+        with self.assertRaises(ValidationError):
+            hold_a.write({'estado': 'activo'})
+        self.assertEqual(hold_a.estado, 'cancelado')
+
+    def test_cantidad_bloqueada_descuenta_reservado(self):
+        hold = self._crear_hold(self.cliente_a)
+        self.env['stock.quant']._update_reserved_quantity(
+            self.product, self.stock_location, 1.0, lot_id=self.lot, strict=True
+        )
+        self.assertAlmostEqual(hold.cantidad, 4.12)
+
+        Quant = self.env['stock.quant']
+        disponible_otro = Quant._get_available_quantity(self.product, self.stock_location, lot_id=self.lot, strict=True)
+        self.assertAlmostEqual(disponible_otro, 0.0)
+        disponible_cliente = Quant.with_context(allowed_partner_id=self.cliente_a.id)._get_available_quantity(
+            self.product, self.stock_location, lot_id=self.lot, strict=True
+        )
+        self.assertAlmostEqual(disponible_cliente, 4.12)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestStockLotImageImport(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.product = cls.env['product.product'].create({
+            'name': 'Travertino',
+            'is_storable': True,
+            'tracking': 'lot',
+        })
+        cls.lotes = {
+            nombre: cls.env['stock.lot'].create({'name': nombre, 'product_id': cls.product.id})
+            for nombre in ('BLQ-12', 'BLQ', 'A-1', 'A', 'L 7', 'L', 'L-0001')
+        }
+        cls.wizard = cls.env['stock.lot.image.import.wizard'].create({
+            'modo_coincidencia': 'lote',
+            'product_id': cls.product.id,
+        })
+
+    def test_claves_archivo(self):
+        self.assertEqual(self.wizard._claves_archivo('BLQ-12.jpg'), ['BLQ-12'])
+        self.assertEqual(self.wizard._claves_archivo('A-1.png'), ['A-1'])
+        self.assertEqual(self.wizard._claves_archivo('L 7.jpg'), ['L 7'])
+        self.assertEqual(self.wizard._claves_archivo('L-0001_2.jpg'), ['L-0001_2', 'L-0001'])
+        self.assertEqual(self.wizard._claves_archivo('L-0001 (3).jpg'), ['L-0001 (3)', 'L-0001'])
+
+    def test_coincidencia_exacta_antes_que_sufijo(self):
+        nombres = ['BLQ-12.jpg', 'A-1.jpg', 'L 7.jpg', 'L-0001_2.jpg', 'L-0001 (3).jpg', 'X-99.jpg']
+        lotes = self.wizard._get_lotes_por_archivo(nombres)
+        self.assertEqual(lotes['BLQ-12.jpg'], self.lotes['BLQ-12'])
+        self.assertEqual(lotes['A-1.jpg'], self.lotes['A-1'])
+        self.assertEqual(lotes['L 7.jpg'], self.lotes['L 7'])
+        self.assertEqual(lotes['L-0001_2.jpg'], self.lotes['L-0001'])
+        self.assertEqual(lotes['L-0001 (3).jpg'], self.lotes['L-0001'])
+        self.assertFalse(lotes['X-99.jpg'])
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import base64
+
+from odoo.exceptions import UserError
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestStockPickingPackingList(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.product = cls.env['product.product'].create({
+            'name': 'Mármol Blanco',
+            'default_code': 'MB-2',
+            'is_storable': True,
+            'tracking': 'lot',
+        })
+        picking_type = cls.env.ref('stock.picking_type_in')
+        cls.picking = cls.env['stock.picking'].create({
+            'picking_type_id': picking_type.id,
+            'location_id': cls.env.ref('stock.stock_location_suppliers').id,
+            'location_dest_id': cls.env.ref('stock.stock_location_stock').id,
+            'move_ids': [(0, 0, {
+                'name': cls.product.name,
+                'product_id': cls.product.id,
+                'product_uom': cls.product.uom_id.id,
+                'product_uom_qty': 20.0,
+                'location_id': cls.env.ref('stock.stock_location_suppliers').id,
+                'location_dest_id': cls.env.ref('stock.stock_location_stock').id,
+            })],
+        })
+        cls.picking.action_confirm()
+
+    def _importar(self, contenido, nombre='packing.csv'):
+        wizard = self.env['stock.picking.packing.list.wizard'].create({
+            'picking_id': self.picking.id,
+            'archivo': base64.b64encode(contenido),
+            'archivo_nombre': nombre,
+        })
+        wizard.action_importar()
+        return wizard
+
+    def test_importa_formato_no_por_defecto(self):
+        contenido = (
+            'Lote;Grosor;Alto;Ancho;Bloque;Atado;Formato\n'
+            'PL-001;2;0,60;1,20;B-10;A-1;0.60 x 1.20 m\n'
+            'PL-002;2;3,20;1,60;B-10;A-1;Placa\n'
+        ).encode()
+        wizard = self._importar(contenido)
+
+        lote = self.env['stock.lot'].search([('name', '=', 'PL-001'), ('product_id', '=', self.product.id)])
+        self.assertEqual(lote.x_formato, '060x120')
+        self.assertEqual(lote.x_bloque, 'B-10')
+        self.assertAlmostEqual(lote.x_area, 0.72)
+        linea = self.picking.move_line_ids.filtered(lambda l: l.lot_id == lote)
+        self.assertAlmostEqual(linea.quantity, 0.72)
+        self.assertEqual(linea.x_formato_temp, '060x120')
+        self.assertAlmostEqual(linea.x_alto_temp, 0.60)
+        self.assertIn('Placas importadas: 2', wizard.resultado)
+
+    def test_reemplaza_lineas_sin_lote(self):
+        self.assertTrue(self.picking.move_line_ids.filtered(lambda l: not l.lot_id))
+        self._importar(b'Lote,Alto,Ancho\nPL-030,3.2,1.6\nPL-031,3.2,1.6\n')
+        self.assertFalse(self.picking.move_line_ids.filtered(lambda l: not l.lot_id))
+        self.assertAlmostEqual(sum(self.picking.move_line_ids.mapped('quantity')), 10.24)
+
+    def test_errores_por_fila_no_abortan(self):
+        contenido = (
+            'Lote,Alto,Ancho\n'
+            'PL-010,3.2,1.6\n'
+            'PL-011,abc,1.6\n'
+            ',3.2,1.6\n'
+        ).encode()
+        wizard = self._importar(contenido)
+        self.assertIn('Placas importadas: 1', wizard.resultado)
+        self.assertIn('Fila 3: alto no numérico', wizard.resultado)
+        self.assertIn('Fila 4: falta el lote', wizard.resultado)
+
+    def test_csv_windows_1252(self):
+        contenido = 'Número de lote;Alto;Ancho;Formato\nPL-020;3,2;1,6;Placa\n'.encode('cp1252')
+        wizard = self._importar(contenido)
+        self.assertIn('Placas importadas: 1', wizard.resultado)
+
+    def test_sin_columna_lote(self):
+        with self.assertRaises(UserError):
+            self._importar(b'Alto,Ancho\n3.2,1.6\n')
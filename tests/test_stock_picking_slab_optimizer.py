@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import random
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase, tagged
+
+from ..wizard import stock_picking_slab_optimizer_wizard as optimizador
+
+
+@tagged('post_install', '-at_install')
+class TestStockPickingSlabOptimizer(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Wizard = cls.env['stock.picking.slab.optimizer.wizard']
+        cls.stock_location = cls.env.ref('stock.stock_location_stock')
+        cls.customer_location = cls.env.ref('stock.stock_location_customers')
+        cls.product = cls.env['product.product'].create({
+            'name': 'Granito Negro',
+            'is_storable': True,
+            'tracking': 'lot',
+        })
+
+    def _assert_asignacion_valida(self, piezas, placas, asignaciones, sin_asignar):
+        self.assertEqual(len(asignaciones) + len(sin_asignar), len(piezas))
+        for _ref, placa, x, y, alto, ancho, _girada in asignaciones:
+            placa_alto, placa_ancho = placas[placa]
+            self.assertLessEqual(x + alto, placa_alto + 1e-9)
+            self.assertLessEqual(y + ancho, placa_ancho + 1e-9)
+        for i, (_r1, p1, x1, y1, a1, b1, _g1) in enumerate(asignaciones):
+            for _r2, p2, x2, y2, a2, b2, _g2 in asignaciones[i + 1:]:
+                if p1 == p2:
+                    self.assertTrue(
+                        x1 + a1 <= x2 + 1e-9 or x2 + a2 <= x1 + 1e-9
+                        or y1 + b1 <= y2 + 1e-9 or y2 + b2 <= y1 + 1e-9,
+                        'Piezas superpuestas en la misma placa',
+                    )
+
+    def _calcular(self, piezas, placas, con_numpy):
+        numpy = optimizador.numpy if con_numpy else None
+        with patch.object(optimizador, 'numpy', numpy):
+            return self.Wizard._calcular_asignacion(piezas, placas, rotar=True, corte=0.005)
+
+    def test_asignacion_valida(self):
+        rnd = random.Random(7)
+        for _prueba in range(50):
+            placas = [(rnd.uniform(1.0, 3.4), rnd.uniform(0.8, 2.0)) for _i in range(rnd.randint(1, 6))]
+            piezas = [(f'P{i}', rnd.uniform(0.1, 2.5), rnd.uniform(0.1, 1.2)) for i in range(rnd.randint(1, 12))]
+            asignaciones, sin_asignar = self._calcular(piezas, placas, con_numpy=False)
+            self._assert_asignacion_valida(piezas, placas, asignaciones, sin_asignar)
+            if optimizador.numpy is not None:
+                self.assertEqual(
+                    (asignaciones, sin_asignar), self._calcular(piezas, placas, con_numpy=True)
+                )
+
+    def test_prefiere_placa_abierta_y_rota(self):
+        placas = [(3.2, 1.6), (3.2, 1.6)]
+        piezas = [('Cubierta', 3.0, 0.65), ('Isla', 0.9, 2.0)]
+        asignaciones, sin_asignar = self._calcular(piezas, placas, con_numpy=False)
+        self.assertFalse(sin_asignar)
+        self.assertEqual({placa for _ref, placa, *_resto in asignaciones}, {0})
+        isla = next(a for a in asignaciones if a[0] == 'Isla')
+        self.assertTrue(isla[6])
+
+    def test_proponer_lineas_respeta_demanda(self):
+        quants = self.env['stock.quant']
+        for nombre in ('GN-1', 'GN-2'):
+            lote = self.env['stock.lot'].create({
+                'name': nombre, 'product_id': self.product.id, 'x_alto': 3.2, 'x_ancho': 1.6,
+            })
+            quants._update_available_quantity(self.product, self.stock_location, 5.12, lot_id=lote)
+        picking = self.env['stock.picking'].create({
+            'picking_type_id': self.env.ref('stock.picking_type_out').id,
+            'location_id': self.stock_location.id,
+            'location_dest_id': self.customer_location.id,
+            'move_ids': [(0, 0, {
+                'name': self.product.name,
+                'product_id': self.product.id,
+                'product_uom': self.product.uom_id.id,
+                'product_uom_qty': 6.0,
+                'location_id': self.stock_location.id,
+                'location_dest_id': self.customer_location.id,
+            })],
+        })
+        picking.action_confirm()
+        picking.move_ids.move_line_ids.unlink()
+
+        wizard = self.Wizard.create({
+            'picking_id': picking.id,
+            'product_id': self.product.id,
+            'quant_ids': [(6, 0, quants.search([('product_id', '=', self.product.id),
+                                                ('location_id', '=', self.stock_location.id)]).ids)],
+        })
+        wizard.action_proponer_lineas()
+        self.assertAlmostEqual(sum(picking.move_ids.move_line_ids.mapped('quantity')), 6.0)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Trazas estructuradas para las rutas críticas del módulo.
+
+Se activan por modelo/método con el parámetro de sistema
+``stock_lot_dimensions.trace``, una lista separada por comas de claves
+``modelo.metodo``. Se admiten comodines: ``stock.move.line.*`` o ``*``.
+
+Ejemplo: ``stock.move.line.write,stock.picking._action_assign``
+
+Cada span registra en el logger ``odoo.addons.stock_lot_dimensions.trace``
+una línea con la duración, el número de consultas SQL ejecutadas y los
+atributos añadidos por el código. Con el parámetro vacío solo se paga la
+lectura cacheada del parámetro.
+"""
+import functools
+import logging
+import time
+from contextlib import contextmanager
+
+_logger = logging.getLogger('odoo.addons.stock_lot_dimensions.trace')
+
+TRACE_PARAM = 'stock_lot_dimensions.trace'
+
+
+class _NullSpan(dict):
+    """Span inactivo: acepta atributos y los descarta"""
+
+    def __setitem__(self, key, value):
+        pass
+
+    def update(self, *args, **kwargs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+@functools.lru_cache(maxsize=32)
+def _parse_param(value):
+    return frozenset(key.strip() for key in value.split(',') if key.strip())
+
+
+def trace_enabled(env, key):
+    """Indica si la clave ``modelo.metodo`` tiene las trazas activadas"""
+    value = env['ir.config_parameter'].sudo().get_param(TRACE_PARAM)
+    if not value:
+        return False
+    keys = _parse_param(value)
+    if '*' in keys or key in keys:
+        return True
+    model = key.rsplit('.', 1)[0]
+    return f'{model}.*' in keys
+
+
+@contextmanager
+def trace_span(env, key, **attrs):
+    """
+    Span de traza. Devuelve un diccionario donde el código puede añadir
+    atributos; si la traza está desactivada el diccionario los descarta.
+    """
+    if not trace_enabled(env, key):
+        yield _NULL_SPAN
+        return
+
+    span = dict(attrs)
+    cr = env.cr
+    queries_inicio = getattr(cr, 'sql_log_count', 0)
+    inicio = time.perf_counter()
+    error = None
+    try:
+        yield span
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        span['ms'] = round((time.perf_counter() - inicio) * 1000, 2)
+        span['queries'] = getattr(cr, 'sql_log_count', 0) - queries_inicio
+        if error is not None:
+            span['error'] = type(error).__name__
+        _logger.info(
+            "[TRACE] %s %s", key,
+            ' '.join(f'{k}={v}' for k, v in span.items()),
+        )
+
+
+def traced(func):
+    """Decorador: envuelve el método en un span ``<_name>.<método>``"""
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        key = f'{self._name}.{func.__name__}'
+        if not trace_enabled(self.env, key):
+            return func(self, *args, **kwargs)
+        with trace_span(self.env, key, records=len(self)):
+            return func(self, *args, **kwargs)
+    return wrapper
@@ -1,3 +1,7 @@
 # -*- coding: utf-8 -*-
 from . import stock_lot_image_wizard
-from . import stock_lot_hold_wizard
\ No newline at end of file
+from . import stock_lot_hold_wizard
+from . import stock_lot_image_import_wizard
+from . import stock_picking_packing_list_wizard
+from . import stock_quant_dimension_search_wizard
+from . import stock_picking_slab_optimizer_wizard
\ No newline at end of file
@@ -77,19 +77,7 @@ class StockLotHoldWizard(models.TransientModel):
         """Crear el hold y cerrar el wizard"""
         self.ensure_one()
         
-        # Verificar que no haya hold activo
-        hold_existente = self.env['stock.lot.hold'].search([
-            ('quant_id', '=', self.quant_id.id),
-            ('estado', '=', 'activo')
-        ], limit=1)
-        
-        if hold_existente:
-            raise models.UserError(
-                f'Este lote ya tiene una reserva activa para {hold_existente.partner_id.name} '
-                f'que expira el {hold_existente.fecha_expiracion.strftime("%d/%m/%Y")}'
-            )
-        
-        # Crear el hold
+        # Crear el hold (la BD rechaza un segundo hold activo en el mismo quant)
         hold = self.env['stock.lot.hold'].create({
             'lot_id': self.lot_id.id,
             'quant_id': self.quant_id.id,
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools.image import base64_to_image
+import base64
+import contextlib
+import hashlib
+import io
+import logging
+import os
+import re
+import zipfile
+
+_logger = logging.getLogger(__name__)
+
+EXTENSIONES_IMAGEN = ('.jpg', '.jpeg', '.png', '.webp', '.heic', '.tif', '.tiff', '.bmp')
+
+# Índice de foto que se ignora cuando el nombre completo no coincide con
+# ningún lote: "L-0001_2.jpg", "L-0001 (3).jpg" -> "L-0001". Solo se admiten
+# estas dos convenciones; "BLQ-12", "A-1" o "L 7" son nombres de lote válidos.
+SUFIJO_FOTO = re.compile(r'(\s*\(\d+\)|_\d{1,2})$')
+
+# Fotografías por create(): acota la memoria de imágenes decodificadas
+TAMANO_LOTE_CREACION = 20
+
+
+class StockLotImageImportWizard(models.TransientModel):
+    _name = 'stock.lot.image.import.wizard'
+    _description = 'Wizard para importar fotografías de lotes en lote'
+
+    picking_id = fields.Many2one(
+        'stock.picking',
+        string='Recepción',
+        help='Si se indica, solo se buscan lotes de esta recepción'
+    )
+    
+    product_id = fields.Many2one(
+        'product.product',
+        string='Producto',
+        help='Limitar la búsqueda de lotes a este producto'
+    )
+    
+    modo_coincidencia = fields.Selection([
+        ('lote', 'Número de Lote'),
+        ('bloque', 'Bloque (todas las placas del bloque)'),
+        ('atado', 'Atado (todas las placas del atado)'),
+    ], string='Nombre de archivo =', default='lote', required=True)
+    
+    archivo_zip = fields.Binary(
+        string='Archivo ZIP',
+        help='ZIP con las fotografías nombradas por lote, bloque o atado'
+    )
+    
+    archivo_zip_nombre = fields.Char(string='Nombre del ZIP')
+    
+    attachment_ids = fields.Many2many(
+        'ir.attachment',
+        string='Fotografías',
+        help='Fotografías sueltas nombradas por lote, bloque o atado'
+    )
+    
+    resultado = fields.Text(
+        string='Resultado',
+        readonly=True
+    )
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        if self.env.context.get('active_model') == 'stock.picking' and self.env.context.get('active_id'):
+            res['picking_id'] = self.env.context['active_id']
+        return res
+
+    def _get_adjunto_zip(self):
+        """Adjunto del filestore que guarda el campo archivo_zip"""
+        return self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'archivo_zip'),
+        ], limit=1)
+
+    @contextlib.contextmanager
+    def _abrir_zip(self):
+        """
+        Abrir el ZIP directamente desde el filestore, sin decodificar el
+        base64 completo en memoria; zipfile lee cada entrada bajo demanda.
+        """
+        adjunto = self._get_adjunto_zip()
+        if adjunto.store_fname:
+            origen = adjunto._full_path(adjunto.store_fname)
+        else:
+            origen = io.BytesIO(base64.b64decode(self.archivo_zip))
+        try:
+            with zipfile.ZipFile(origen) as zf:
+                yield zf
+        except zipfile.BadZipFile:
+            raise UserError('El archivo no es un ZIP válido.')
+
+    @staticmethod
+    def _es_imagen_zip(info):
+        nombre = os.path.basename(info.filename)
+        return not info.is_dir() and not nombre.startswith('.') and nombre.lower().endswith(EXTENSIONES_IMAGEN)
+
+    def _get_nombres_archivos(self):
+        """Nombres de todos los archivos a importar (sin leer su contenido)"""
+        nombres = []
+        if self.archivo_zip:
+            with self._abrir_zip() as zf:
+                nombres += [os.path.basename(info.filename) for info in zf.infolist() if self._es_imagen_zip(info)]
+        nombres += self.attachment_ids.mapped('name')
+        return nombres
+
+    def _iter_archivos(self):
+        """Genera (nombre de archivo, contenido binario) de uno en uno"""
+        if self.archivo_zip:
+            with self._abrir_zip() as zf:
+                for info in zf.infolist():
+                    if self._es_imagen_zip(info):
+                        yield os.path.basename(info.filename), zf.read(info)
+        for attachment in self.attachment_ids:
+            yield attachment.name, attachment.raw
+
+    @api.model
+    def _claves_archivo(self, nombre):
+        """
+        Claves candidatas del archivo, en orden de preferencia: el nombre
+        sin extensión tal cual y, si lleva índice de foto, sin él.
+        """
+        clave = os.path.splitext(nombre)[0].strip()
+        sin_indice = SUFIJO_FOTO.sub('', clave).strip()
+        return [clave, sin_indice] if sin_indice and sin_indice != clave else [clave]
+
+    def _get_lotes_por_archivo(self, nombres):
+        """
+        Mapa nombre de archivo -> lotes según el modo de coincidencia (una
+        sola búsqueda). Primero se intenta el nombre exacto y solo si no
+        coincide se prueba sin el índice de foto.
+        """
+        campo = {'lote': 'name', 'bloque': 'x_bloque', 'atado': 'x_atado'}[self.modo_coincidencia]
+        claves_por_nombre = {nombre: self._claves_archivo(nombre) for nombre in nombres}
+        domain = [(campo, 'in', list({clave for claves in claves_por_nombre.values() for clave in claves}))]
+        if self.picking_id:
+            domain.append(('id', 'in', self.picking_id.move_line_ids.lot_id.ids))
+        if self.product_id:
+            domain.append(('product_id', '=', self.product_id.id))
+        lotes_por_clave = {}
+        for lote in self.env['stock.lot'].search(domain):
+            lotes_por_clave.setdefault(lote[campo], self.env['stock.lot'])
+            lotes_por_clave[lote[campo]] |= lote
+        return {
+            nombre: next((lotes_por_clave[clave] for clave in claves if clave in lotes_por_clave), self.env['stock.lot'])
+            for nombre, claves in claves_por_nombre.items()
+        }
+
+    def action_importar(self):
+        """
+        Importar las fotografías y crear los registros stock.lot.image.
+
+        Los archivos se leen y validan de uno en uno y los registros se
+        crean por bloques, de modo que en memoria solo hay unas pocas
+        imágenes a la vez aunque el ZIP tenga cientos.
+        """
+        self.ensure_one()
+        nombres = self._get_nombres_archivos()
+        if not nombres:
+            raise UserError('Debe cargar un ZIP o al menos una fotografía.')
+        lotes_por_archivo = self._get_lotes_por_archivo(nombres)
+        
+        errores = []
+        creadas = 0
+        lotes_con_foto = self.env['stock.lot']
+        vals_list = []
+        for nombre, contenido in self._iter_archivos():
+            lotes = lotes_por_archivo.get(nombre)
+            if not lotes:
+                errores.append(f'{nombre}: no coincide con ningún lote')
+                continue
+            try:
+                datos = base64.b64encode(contenido)
+                base64_to_image(datos)
+            except Exception as e:
+                errores.append(f'{nombre}: {str(e) or "imagen no válida"}')
+                continue
+            checksum = hashlib.sha1(contenido).hexdigest()
+            lotes_con_foto |= lotes
+            vals_list.extend({
+                'lot_id': lote.id,
+                'name': os.path.splitext(nombre)[0],
+                'image': datos,
+                'checksum': checksum,
+            } for lote in lotes)
+            if len(vals_list) >= TAMANO_LOTE_CREACION:
+                self.env['stock.lot.image'].create(vals_list)
+                creadas += len(vals_list)
+                vals_list = []
+        if vals_list:
+            self.env['stock.lot.image'].create(vals_list)
+            creadas += len(vals_list)
+        
+        lineas = [
+            f'Fotografías procesadas: {len(nombres)}',
+            f'Fotografías creadas: {creadas} en {len(lotes_con_foto)} lote(s)',
+        ]
+        if errores:
+            lineas += ['', f'Archivos no importados ({len(errores)}):'] + errores
+        self.resultado = '\n'.join(lineas)
+        
+        return {
+            'name': 'Importar Fotografías',
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
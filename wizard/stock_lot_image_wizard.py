@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
+from odoo.exceptions import UserError
+from datetime import timedelta
 
 class StockLotImageWizard(models.TransientModel):
     _name = 'stock.lot.image.wizard'
@@ -18,10 +20,11 @@ class StockLotImageWizard(models.TransientModel):
         default='Fotografía'
     )
     
-    image = fields.Binary(
+    adjunto_id = fields.Many2one(
+        'ir.attachment',
         string='Imagen',
-        required=True,
-        attachment=True
+        help='Archivo subido por el widget de carga (multipart por trozos); '
+             'la fotografía del lote se crea al guardar'
     )
     
     sequence = fields.Integer(
@@ -33,16 +36,69 @@ class StockLotImageWizard(models.TransientModel):
         string='Notas',
         placeholder='Notas adicionales sobre esta fotografía...'
     )
+    
+    conservar_original = fields.Boolean(
+        string='Conservar original',
+        help='Enviar la fotografía a resolución completa. Por defecto se reduce '
+             'y recomprime en el navegador antes de subirla.'
+    )
+    
+    aplicar_a_atado = fields.Boolean(
+        string='Aplicar a todo el atado',
+        help='Agregar la misma fotografía a los lotes del mismo producto y atado que están '
+             'en existencia o en una operación pendiente. '
+             'El archivo se guarda una sola vez y se comparte entre los lotes.'
+    )
+    
+    x_atado = fields.Char(related='lot_id.x_atado', readonly=True)
+
+    def _get_lotes_atado(self):
+        """
+        Lotes vigentes del mismo producto y atado: con existencias en
+        ubicaciones internas o en una operación pendiente (p. ej. la
+        recepción en curso). Se excluyen lotes consumidos de contenedores
+        anteriores que reutilizan el mismo código de atado.
+        """
+        dominio_atado = [
+            ('product_id', '=', self.lot_id.product_id.id),
+            ('lot_id.x_atado', '=', self.lot_id.x_atado),
+        ]
+        en_stock = self.env['stock.quant'].search(dominio_atado + [
+            ('location_id.usage', '=', 'internal'),
+            ('quantity', '>', 0),
+        ]).lot_id
+        en_operacion = self.env['stock.move.line'].search(dominio_atado + [
+            ('state', 'not in', ('done', 'cancel')),
+        ]).lot_id
+        return en_stock | en_operacion
+
+    @api.autovacuum
+    def _gc_adjuntos_sin_usar(self):
+        """
+        Borrar los archivos subidos que ningún wizard llegó a guardar
+        (wizard cancelado o fotografía cambiada antes de guardar).
+        """
+        self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', False),
+            ('create_date', '<', fields.Datetime.now() - timedelta(days=1)),
+        ]).unlink()
 
     def action_save_image(self):
         """Guardar la imagen y cerrar el wizard"""
         self.ensure_one()
         
-        # Crear el registro de imagen
-        self.env['stock.lot.image'].create({
-            'lot_id': self.lot_id.id,
+        # Solo archivos subidos para este wizard (no adjuntos de otros documentos)
+        if not self.adjunto_id or self.adjunto_id.res_model != self._name or self.adjunto_id.res_field:
+            raise UserError('Debe tomar o elegir una fotografía.')
+        
+        lotes = self.lot_id
+        if self.aplicar_a_atado and self.lot_id.x_atado:
+            lotes |= self._get_lotes_atado()
+        
+        # Una fotografía por lote; el archivo subido se comparte en el filestore
+        self.env['stock.lot.image']._crear_desde_adjunto(lotes, self.adjunto_id, {
             'name': self.name,
-            'image': self.image,
             'sequence': self.sequence,
             'notas': self.notas,
         })
@@ -53,7 +109,8 @@ class StockLotImageWizard(models.TransientModel):
             'tag': 'display_notification',
             'params': {
                 'title': '¡Éxito!',
-                'message': f'Fotografía agregada correctamente al lote {self.lot_id.name}',
+                'message': f'Fotografía agregada correctamente a {len(lotes)} lote(s)' if len(lotes) > 1
+                           else f'Fotografía agregada correctamente al lote {self.lot_id.name}',
                 'type': 'success',
                 'sticky': False,
                 'next': {'type': 'ir.actions.act_window_close'},
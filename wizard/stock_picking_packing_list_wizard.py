@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+import base64
+import csv
+import io
+import logging
+import unicodedata
+
+_logger = logging.getLogger(__name__)
+
+# Encabezados aceptados (normalizados: minúsculas, sin acentos) -> columna
+COLUMNAS = {
+    'lote': 'lote', 'lot': 'lote', 'numero de lote': 'lote', 'placa': 'lote',
+    'producto': 'producto', 'referencia': 'producto', 'codigo': 'producto', 'default_code': 'producto',
+    'grosor': 'grosor', 'espesor': 'grosor',
+    'alto': 'alto', 'largo': 'alto',
+    'ancho': 'ancho',
+    'bloque': 'bloque',
+    'atado': 'atado',
+    'formato': 'formato',
+    'cantidad': 'cantidad', 'm2': 'cantidad',
+}
+
+
+def _normalizar(texto):
+    texto = unicodedata.normalize('NFKD', str(texto or '')).encode('ascii', 'ignore').decode()
+    return ' '.join(texto.lower().replace('_', ' ').split())
+
+
+class StockPickingPackingListWizard(models.TransientModel):
+    _name = 'stock.picking.packing.list.wizard'
+    _description = 'Wizard para importar packing list en recepciones'
+
+    picking_id = fields.Many2one(
+        'stock.picking',
+        string='Recepción',
+        required=True,
+        readonly=True
+    )
+    
+    archivo = fields.Binary(
+        string='Packing List',
+        required=True,
+        help='CSV o XLSX con una fila por placa: lote, producto, grosor, alto, '
+             'ancho, bloque, atado, formato y opcionalmente cantidad'
+    )
+    
+    archivo_nombre = fields.Char(string='Nombre del Archivo')
+    
+    tamano_lote = fields.Integer(
+        string='Filas por Lote',
+        default=200,
+        help='Número de filas que se crean en cada operación masiva'
+    )
+    
+    resultado = fields.Text(
+        string='Resultado',
+        readonly=True
+    )
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        if self.env.context.get('active_model') == 'stock.picking' and self.env.context.get('active_id'):
+            res['picking_id'] = self.env.context['active_id']
+        return res
+
+    # ------------------------------------------------------------------
+    # LECTURA
+    # ------------------------------------------------------------------
+    def _iter_filas(self):
+        """Genera (número de fila, dict columna -> valor) leyendo el archivo en flujo"""
+        datos = base64.b64decode(self.archivo)
+        nombre = (self.archivo_nombre or '').lower()
+        if nombre.endswith(('.xlsx', '.xlsm')):
+            filas = self._iter_filas_xlsx(datos)
+        else:
+            filas = self._iter_filas_csv(datos)
+        
+        encabezados = None
+        for numero, fila in enumerate(filas, start=1):
+            if encabezados is None:
+                encabezados = [COLUMNAS.get(_normalizar(celda)) for celda in fila]
+                if 'lote' not in encabezados:
+                    raise UserError('El packing list debe tener una columna "Lote".')
+                continue
+            if not any(celda not in (None, '') for celda in fila):
+                continue
+            yield numero, {
+                columna: celda for columna, celda in zip(encabezados, fila) if columna
+            }
+
+    @api.model
+    def _decodificar_csv(self, datos):
+        """
+        Texto del CSV: UTF-8 (con o sin BOM) o, si no lo es, Windows-1252,
+        que es como Excel exporta CSV con encabezados acentuados.
+        """
+        for codificacion in ('utf-8-sig', 'cp1252'):
+            try:
+                return datos.decode(codificacion)
+            except UnicodeDecodeError:
+                continue
+        raise UserError('No se pudo leer el CSV: guárdelo como UTF-8 o Windows-1252.')
+
+    @api.model
+    def _iter_filas_csv(self, datos):
+        texto = io.StringIO(self._decodificar_csv(datos), newline='')
+        muestra = texto.read(4096)
+        texto.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        try:
+            yield from csv.reader(texto, dialecto)
+        except csv.Error as e:
+            raise UserError(f'El CSV no es válido: {e}')
+
+    @api.model
+    def _iter_filas_xlsx(self, datos):
+        try:
+            import openpyxl
+        except ImportError:
+            raise UserError('Para importar archivos XLSX se requiere la librería openpyxl.')
+        libro = openpyxl.load_workbook(io.BytesIO(datos), read_only=True, data_only=True)
+        try:
+            yield from libro.active.iter_rows(values_only=True)
+        finally:
+            libro.close()
+
+    # ------------------------------------------------------------------
+    # VALIDACIÓN
+    # ------------------------------------------------------------------
+    @api.model
+    def _to_float(self, valor, campo, requerido=False):
+        if valor in (None, ''):
+            if requerido:
+                raise ValueError(f'falta {campo}')
+            return 0.0
+        try:
+            numero = float(valor) if isinstance(valor, (int, float)) else float(str(valor).replace(',', '.'))
+        except ValueError:
+            raise ValueError(f'{campo} no numérico: {valor}')
+        if numero < 0:
+            raise ValueError(f'{campo} negativo: {valor}')
+        return numero
+
+    def _validar_fila(self, fila, productos, formatos):
+        """Convierte una fila en valores de lote; lanza ValueError con el motivo"""
+        nombre = str(fila.get('lote') or '').strip()
+        if not nombre:
+            raise ValueError('falta el lote')
+        
+        codigo = str(fila.get('producto') or '').strip()
+        if codigo:
+            producto = productos.get(codigo)
+            if not producto:
+                raise ValueError(f'producto "{codigo}" no está en la recepción')
+        elif len(set(productos.values())) == 1:
+            producto = next(iter(productos.values()))
+        else:
+            raise ValueError('falta el producto (la recepción tiene varios)')
+        
+        formato = 'placa'
+        if fila.get('formato') not in (None, ''):
+            formato = formatos.get(_normalizar(fila['formato']))
+            if not formato:
+                raise ValueError(f'formato desconocido: {fila["formato"]}')
+        
+        alto = self._to_float(fila.get('alto'), 'alto', requerido=True)
+        ancho = self._to_float(fila.get('ancho'), 'ancho', requerido=True)
+        cantidad = self._to_float(fila.get('cantidad'), 'cantidad') or alto * ancho
+        if not cantidad:
+            raise ValueError('cantidad en cero')
+        
+        return producto, {
+            'name': nombre,
+            'x_grosor': self._to_float(fila.get('grosor'), 'grosor'),
+            'x_alto': alto,
+            'x_ancho': ancho,
+            'x_bloque': str(fila.get('bloque') or '').strip() or False,
+            'x_atado': str(fila.get('atado') or '').strip() or False,
+            'x_formato': formato,
+        }, cantidad
+
+    # ------------------------------------------------------------------
+    # IMPORTACIÓN
+    # ------------------------------------------------------------------
+    def _crear_lote_de_filas(self, filas, movimientos):
+        """
+        Crear en bloque los lotes y las move lines de un grupo de filas ya
+        validadas. Las dimensiones van en los campos temporales de cada
+        línea y las escribe en los lotes el write agrupado de
+        stock.move.line; los lotes existentes del mismo producto se
+        reutilizan. Las líneas sin lote que la reserva dejó en los
+        movimientos se eliminan para no duplicar la demanda.
+        """
+        Lot = self.env['stock.lot']
+        company = self.picking_id.company_id
+        existentes = {
+            (lote.product_id.id, lote.name): lote
+            for lote in Lot.search([
+                ('name', 'in', [vals['name'] for _n, _p, vals, _c in filas]),
+                ('product_id', 'in', list({producto.id for _n, producto, _v, _c in filas})),
+                ('company_id', 'in', [company.id, False]),
+            ])
+        }
+        
+        nuevos = [
+            {'name': vals['name'], 'product_id': producto.id, 'company_id': company.id}
+            for _n, producto, vals, _c in filas
+            if (producto.id, vals['name']) not in existentes
+        ]
+        for lote in Lot.create(nuevos):
+            existentes[(lote.product_id.id, lote.name)] = lote
+        
+        moves = self.env['stock.move'].browse([movimientos[producto.id].id for _n, producto, _v, _c in filas])
+        moves.move_line_ids.filtered(lambda l: not l.lot_id and not l.lot_name).unlink()
+        
+        lineas = []
+        for _numero, producto, vals, cantidad in filas:
+            move = movimientos[producto.id]
+            lineas.append({
+                'picking_id': self.picking_id.id,
+                'move_id': move.id,
+                'product_id': producto.id,
+                'product_uom_id': move.product_uom.id,
+                'location_id': move.location_id.id,
+                'location_dest_id': move.location_dest_id.id,
+                'lot_id': existentes[(producto.id, vals['name'])].id,
+                'quantity': cantidad,
+                'x_grosor_temp': vals['x_grosor'],
+                'x_alto_temp': vals['x_alto'],
+                'x_ancho_temp': vals['x_ancho'],
+                'x_bloque_temp': vals['x_bloque'],
+                'x_atado_temp': vals['x_atado'],
+                'x_formato_temp': vals['x_formato'],
+            })
+        self.env['stock.move.line'].create(lineas)
+
+    def action_importar(self):
+        """Validar el packing list y crear lotes y move lines por bloques"""
+        self.ensure_one()
+        if self.picking_id.picking_type_code != 'incoming':
+            raise UserError('El packing list solo se puede importar en recepciones.')
+        
+        movimientos = {}
+        for move in self.picking_id.move_ids.filtered(lambda m: m.state not in ('done', 'cancel')):
+            movimientos.setdefault(move.product_id.id, move)
+        if not movimientos:
+            raise UserError('La recepción no tiene movimientos pendientes.')
+        
+        productos = {}
+        for move in movimientos.values():
+            producto = move.product_id
+            productos[producto.default_code or producto.display_name] = producto
+            productos[producto.display_name] = producto
+        formatos = {}
+        for clave, etiqueta in self.env['stock.lot']._fields['x_formato'].selection:
+            formatos[_normalizar(clave)] = clave
+            formatos[_normalizar(etiqueta)] = clave
+        
+        lotes_en_picking = set(self.picking_id.move_line_ids.mapped(lambda l: (l.product_id.id, l.lot_id.name)))
+        errores = []
+        importadas = 0
+        pendientes = []
+        
+        def _procesar(grupo):
+            try:
+                with self.env.cr.savepoint():
+                    self._crear_lote_de_filas(grupo, movimientos)
+                return len(grupo)
+            except Exception as e:
+                if len(grupo) > 1:
+                    # Reintentar fila por fila para reportar la que falla
+                    return sum(_procesar([fila]) for fila in grupo)
+                _logger.warning("Packing list: error en fila %s: %s", grupo[0][0], e)
+                errores.append(f'Fila {grupo[0][0]}: {e}')
+                return 0
+        
+        for numero, fila in self._iter_filas():
+            try:
+                producto, vals, cantidad = self._validar_fila(fila, productos, formatos)
+            except ValueError as e:
+                errores.append(f'Fila {numero}: {e}')
+                continue
+            if (producto.id, vals['name']) in lotes_en_picking:
+                errores.append(f'Fila {numero}: el lote {vals["name"]} ya está en la recepción')
+                continue
+            lotes_en_picking.add((producto.id, vals['name']))
+            pendientes.append((numero, producto, vals, cantidad))
+            if len(pendientes) >= max(1, self.tamano_lote):
+                importadas += _procesar(pendientes)
+                pendientes = []
+        if pendientes:
+            importadas += _procesar(pendientes)
+        
+        lineas = [f'Placas importadas: {importadas}']
+        if errores:
+            lineas += ['', f'Errores ({len(errores)}):'] + errores
+        self.resultado = '\n'.join(lineas)
+        
+        return {
+            'name': 'Importar Packing List',
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import float_compare
+import logging
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import numpy
+except ImportError:
+    _logger.info("numpy no está instalado: el optimizador de placas usará la versión en Python puro")
+    numpy = None
+
+
+class StockPickingSlabOptimizerPieza(models.TransientModel):
+    _name = 'stock.picking.slab.optimizer.pieza'
+    _description = 'Pieza requerida para el optimizador de placas'
+
+    wizard_id = fields.Many2one(
+        'stock.picking.slab.optimizer.wizard',
+        required=True,
+        ondelete='cascade'
+    )
+
+    referencia = fields.Char(string='Referencia')
+
+    alto = fields.Float(
+        string='Alto (m)',
+        digits=(10, 4),
+        required=True
+    )
+
+    ancho = fields.Float(
+        string='Ancho (m)',
+        digits=(10, 4),
+        required=True
+    )
+
+    cantidad = fields.Integer(
+        string='Cantidad',
+        default=1,
+        required=True
+    )
+
+
+class StockPickingSlabOptimizerWizard(models.TransientModel):
+    _name = 'stock.picking.slab.optimizer.wizard'
+    _description = 'Wizard para asignar piezas de corte a placas disponibles'
+
+    picking_id = fields.Many2one(
+        'stock.picking',
+        string='Entrega',
+        required=True,
+        readonly=True
+    )
+
+    product_id = fields.Many2one(
+        'product.product',
+        string='Producto',
+        required=True
+    )
+
+    partner_id = fields.Many2one(
+        'res.partner',
+        string='Cliente',
+        help='Las placas con hold vigente para este cliente también se consideran'
+    )
+
+    grosor = fields.Float(
+        string='Grosor (cm)',
+        digits=(10, 2)
+    )
+
+    corte = fields.Float(
+        string='Ancho de Corte (m)',
+        digits=(10, 4),
+        default=0.005,
+        help='Material que se pierde en cada corte de disco'
+    )
+
+    rotar = fields.Boolean(
+        string='Permitir Rotar',
+        default=True
+    )
+
+    pieza_ids = fields.One2many(
+        'stock.picking.slab.optimizer.pieza',
+        'wizard_id',
+        string='Piezas'
+    )
+
+    quant_ids = fields.Many2many(
+        'stock.quant',
+        string='Placas Asignadas',
+        readonly=True
+    )
+
+    resultado = fields.Text(
+        string='Resultado',
+        readonly=True
+    )
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        if self.env.context.get('active_model') == 'stock.picking' and self.env.context.get('active_id'):
+            picking = self.env['stock.picking'].browse(self.env.context['active_id'])
+            res['picking_id'] = picking.id
+            move = picking.move_ids[:1]
+            res['partner_id'] = (move.sale_line_id.order_id.partner_id or picking.partner_id).id
+            res['product_id'] = move.product_id.id
+        return res
+
+    # ------------------------------------------------------------------
+    # OPTIMIZACIÓN
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _elegir_rectangulo(libres, n, abiertas, alto, ancho, rotar):
+        """
+        Índice del rectángulo libre donde la pieza deja menos sobrante,
+        priorizando placas ya abiertas, y si la pieza va girada.
+        ``libres`` son las columnas (alto, ancho, placa) de los rectángulos
+        libres, de las que solo las ``n`` primeras filas están en uso;
+        ``abiertas`` marca las placas que ya tienen piezas.
+        Devuelve (None, False) si la pieza no cabe en ninguno.
+        """
+        altos, anchos, placas = libres
+        if numpy is not None:
+            # Vistas sobre los arreglos: sin copias ni conversiones por pieza
+            altos, anchos, placas = altos[:n], anchos[:n], placas[:n]
+            normal = (altos >= alto) & (anchos >= ancho)
+            girada = (altos >= ancho) & (anchos >= alto) if rotar else numpy.zeros_like(normal)
+            cabe = normal | girada
+            if not cabe.any():
+                return None, False
+            sobrante = altos * anchos - alto * ancho
+            # Una placa nueva solo se abre si la pieza no cabe en ninguna abierta
+            sobrante = sobrante + numpy.where(abiertas[placas], 0.0, sobrante.max() + 1.0)
+            indice = int(numpy.argmin(numpy.where(cabe, sobrante, numpy.inf)))
+            return indice, not bool(normal[indice])
+
+        mejor, mejor_sobrante, mejor_girada = None, None, False
+        penalizacion = max((altos[i] * anchos[i] for i in range(n)), default=0.0) + 1.0
+        for indice in range(n):
+            a, b = altos[indice], anchos[indice]
+            normal = a >= alto and b >= ancho
+            if not (normal or (rotar and a >= ancho and b >= alto)):
+                continue
+            sobrante = a * b - alto * ancho + (0.0 if abiertas[placas[indice]] else penalizacion)
+            if mejor_sobrante is None or sobrante < mejor_sobrante:
+                mejor, mejor_sobrante, mejor_girada = indice, sobrante, not normal
+        return mejor, mejor_girada
+
+    @api.model
+    def _calcular_asignacion(self, piezas, placas, rotar=True, corte=0.0):
+        """
+        Asignación de piezas a placas por "best fit decreasing" con cortes
+        de guillotina. ``piezas`` es una lista de (referencia, alto, ancho) y
+        ``placas`` una lista de (alto, ancho). La elección del rectángulo se
+        vectoriza con NumPy cuando está disponible.
+
+        Devuelve (asignaciones, sin_asignar) donde cada asignación es
+        (referencia, índice de placa, x, y, alto, ancho, girada).
+        """
+        # Rectángulos libres: columnas paralelas alto / ancho / placa / x / y,
+        # reservadas de antemano (cada pieza añade como mucho un rectángulo)
+        # y actualizadas en su sitio. Cada pieza ocupa su medida más el
+        # corte; la placa se amplía en un corte para que la última pieza
+        # pueda llegar al borde.
+        total = len(placas) + len(piezas)
+        if numpy is not None:
+            altos, anchos, xs, ys = (numpy.zeros(total) for _i in range(4))
+            indices = numpy.zeros(total, dtype=int)
+            abiertas = numpy.zeros(len(placas), dtype=bool)
+        else:
+            altos, anchos, xs, ys = ([0.0] * total for _i in range(4))
+            indices = [0] * total
+            abiertas = [False] * len(placas)
+        for fila, (a, b) in enumerate(placas):
+            altos[fila], anchos[fila], indices[fila] = float(a) + corte, float(b) + corte, fila
+        n = len(placas)
+
+        asignaciones, sin_asignar = [], []
+        for referencia, alto, ancho in sorted(piezas, key=lambda p: p[1] * p[2], reverse=True):
+            indice, girada = self._elegir_rectangulo(
+                (altos, anchos, indices), n, abiertas, alto + corte, ancho + corte, rotar
+            )
+            if indice is None:
+                sin_asignar.append((referencia, alto, ancho))
+                continue
+
+            pieza_alto, pieza_ancho = (ancho, alto) if girada else (alto, ancho)
+            libre_alto, libre_ancho = float(altos[indice]), float(anchos[indice])
+            placa, x, y = int(indices[indice]), float(xs[indice]), float(ys[indice])
+            abiertas[placa] = True
+            asignaciones.append((referencia, placa, x, y, pieza_alto, pieza_ancho, girada))
+
+            # Guillotina: el sobrante se parte en dos rectángulos, eligiendo
+            # el corte que deja el retazo más grande posible
+            usado_alto, usado_ancho = pieza_alto + corte, pieza_ancho + corte
+            resto_alto, resto_ancho = libre_alto - usado_alto, libre_ancho - usado_ancho
+            if resto_alto * libre_ancho >= libre_alto * resto_ancho:
+                nuevos = [(resto_alto, libre_ancho, x + usado_alto, y), (usado_alto, resto_ancho, x, y + usado_ancho)]
+            else:
+                nuevos = [(resto_alto, usado_ancho, x + usado_alto, y), (libre_alto, resto_ancho, x, y + usado_ancho)]
+
+            # El primero ocupa la fila del rectángulo usado, el segundo una nueva;
+            # un rectángulo vacío queda con medidas cero y ya no admite piezas
+            for fila, (nuevo_alto, nuevo_ancho, nuevo_x, nuevo_y) in zip((indice, n), nuevos):
+                if nuevo_alto <= 0 or nuevo_ancho <= 0:
+                    nuevo_alto = nuevo_ancho = 0.0
+                elif fila == n:
+                    n += 1
+                altos[fila], anchos[fila], indices[fila], xs[fila], ys[fila] = (
+                    nuevo_alto, nuevo_ancho, placa, nuevo_x, nuevo_y
+                )
+        return asignaciones, sin_asignar
+
+    def _get_placas_candidatas(self, piezas):
+        """
+        Quants disponibles donde cabe al menos la pieza más pequeña. Se
+        obtienen con la búsqueda por medidas, que aplica las mismas reglas de
+        hold que la selección manual de lotes (solo se admiten holds
+        vigentes del propio cliente).
+        """
+        if self.rotar:
+            alto_min = ancho_min = min(min(alto, ancho) for _ref, alto, ancho in piezas)
+        else:
+            alto_min = min(alto for _ref, alto, _ancho in piezas)
+            ancho_min = min(ancho for _ref, _alto, ancho in piezas)
+        lotes_en_picking = self.picking_id.move_line_ids.lot_id
+        return self.env['stock.quant']._buscar_placas_por_dimensiones(
+            alto_min=alto_min,
+            ancho_min=ancho_min,
+            grosor=self.grosor,
+            rotar=self.rotar,
+            product_id=self.product_id.id,
+            location_id=self.picking_id.location_id.id,
+            partner_id=self.partner_id.id,
+        ).filtered(lambda q: q.lot_id not in lotes_en_picking)
+
+    def action_optimizar(self):
+        """Calcular la asignación de piezas a placas"""
+        self.ensure_one()
+        if self.picking_id.picking_type_code != 'outgoing':
+            raise UserError('El optimizador solo se puede usar en entregas.')
+        piezas = [
+            (pieza.referencia or f'P{indice}', pieza.alto, pieza.ancho)
+            for indice, pieza in enumerate(self.pieza_ids, start=1)
+            for _copia in range(max(pieza.cantidad, 0))
+            if pieza.alto > 0 and pieza.ancho > 0
+        ]
+        if not piezas:
+            raise UserError('Capture al menos una pieza con alto y ancho.')
+
+        quants = self._get_placas_candidatas(piezas)
+        asignaciones, sin_asignar = self._calcular_asignacion(
+            piezas, [(q.x_alto, q.x_ancho) for q in quants], rotar=self.rotar, corte=self.corte
+        )
+
+        usados = sorted({placa for _ref, placa, *_resto in asignaciones})
+        area_piezas = sum(alto * ancho for _ref, _p, _x, _y, alto, ancho, _g in asignaciones)
+        area_placas = sum(quants[placa].x_area for placa in usados)
+
+        lineas = [
+            f'Placas candidatas: {len(quants)}',
+            f'Piezas asignadas: {len(asignaciones)} de {len(piezas)}',
+            f'Placas usadas: {len(usados)}',
+            f'Área de piezas: {area_piezas:.4f} m² / área de placas: {area_placas:.4f} m²',
+        ]
+        if area_placas:
+            lineas.append(f'Desperdicio: {100.0 * (1 - area_piezas / area_placas):.1f} %')
+        lineas.append('')
+        for referencia, placa, x, y, alto, ancho, girada in sorted(asignaciones, key=lambda a: (a[1], a[2], a[3])):
+            lineas.append(
+                f'{quants[placa].lot_id.name}: {referencia} {alto:g} x {ancho:g} m '
+                f'en ({x:g}, {y:g}){" girada" if girada else ""}'
+            )
+        if sin_asignar:
+            lineas += ['', 'Sin placa:'] + [f'{ref} {alto:g} x {ancho:g} m' for ref, alto, ancho in sin_asignar]
+
+        self.write({
+            'quant_ids': [fields.Command.set([quants[placa].id for placa in usados])],
+            'resultado': '\n'.join(lineas),
+        })
+        return self._reabrir()
+
+    def action_proponer_lineas(self):
+        """Crear las move lines de la entrega con las placas asignadas"""
+        self.ensure_one()
+        if not self.quant_ids:
+            raise UserError('No hay placas asignadas. Ejecute primero la optimización.')
+        move = self.picking_id.move_ids.filtered(
+            lambda m: m.product_id == self.product_id and m.state not in ('done', 'cancel')
+        )[:1]
+        if not move:
+            raise UserError(f'La entrega no tiene un movimiento pendiente de {self.product_id.display_name}.')
+
+        # Demanda pendiente del movimiento, en la unidad del producto
+        uom = self.product_id.uom_id
+        restante = move.product_uom._compute_quantity(move.product_uom_qty, uom) - sum(
+            linea.product_uom_id._compute_quantity(linea.quantity, uom) for linea in move.move_line_ids
+        )
+        if float_compare(restante, 0.0, precision_rounding=uom.rounding) <= 0:
+            raise UserError('La demanda del movimiento ya está cubierta por las líneas existentes.')
+        
+        # Se toman las placas asignadas hasta cubrir la demanda; la última se
+        # ajusta para no reservar más de lo que pide la entrega
+        vals_list = []
+        for quant in self.quant_ids:
+            if float_compare(restante, 0.0, precision_rounding=uom.rounding) <= 0:
+                break
+            cantidad = min(quant.quantity - quant.reserved_quantity, restante)
+            if float_compare(cantidad, 0.0, precision_rounding=uom.rounding) <= 0:
+                continue
+            restante -= cantidad
+            vals_list.append({
+                'picking_id': self.picking_id.id,
+                'move_id': move.id,
+                'product_id': self.product_id.id,
+                'product_uom_id': uom.id,
+                'location_id': quant.location_id.id,
+                'location_dest_id': move.location_dest_id.id,
+                'lot_id': quant.lot_id.id,
+                'quantity': cantidad,
+            })
+        self.env['stock.move.line'].create(vals_list)
+        return {'type': 'ir.actions.act_window_close'}
+
+    def _reabrir(self):
+        return {
+            'name': 'Optimizar Placas',
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
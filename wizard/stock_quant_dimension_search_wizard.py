@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields
+from odoo.exceptions import UserError
+
+
+class StockQuantDimensionSearchWizard(models.TransientModel):
+    _name = 'stock.quant.dimension.search.wizard'
+    _description = 'Wizard para buscar placas por medidas'
+
+    product_id = fields.Many2one(
+        'product.product',
+        string='Producto'
+    )
+    
+    location_id = fields.Many2one(
+        'stock.location',
+        string='Ubicación',
+        domain="[('usage', '=', 'internal')]",
+        help='Incluye las ubicaciones hijas'
+    )
+    
+    partner_id = fields.Many2one(
+        'res.partner',
+        string='Cliente',
+        help='Incluir también las placas con hold vigente para este cliente'
+    )
+    
+    grosor = fields.Float(
+        string='Grosor (cm)',
+        digits=(10, 2)
+    )
+    
+    tolerancia_grosor = fields.Float(
+        string='Tolerancia Grosor (cm)',
+        digits=(10, 2)
+    )
+    
+    alto_min = fields.Float(
+        string='Alto Mínimo (m)',
+        digits=(10, 4)
+    )
+    
+    ancho_min = fields.Float(
+        string='Ancho Mínimo (m)',
+        digits=(10, 4)
+    )
+    
+    alto_max = fields.Float(
+        string='Alto Máximo (m)',
+        digits=(10, 4),
+        help='Dejar en cero para no limitar'
+    )
+    
+    ancho_max = fields.Float(
+        string='Ancho Máximo (m)',
+        digits=(10, 4),
+        help='Dejar en cero para no limitar'
+    )
+    
+    tolerancia = fields.Float(
+        string='Tolerancia (m)',
+        digits=(10, 4),
+        help='Se resta a los mínimos y se suma a los máximos'
+    )
+    
+    rotar = fields.Boolean(
+        string='Permitir Rotar',
+        default=True,
+        help='Considerar la placa girada 90° (alto y ancho intercambiados)'
+    )
+    
+    limite = fields.Integer(
+        string='Máximo de Resultados',
+        default=80
+    )
+
+    def action_buscar(self):
+        """Buscar placas que cubren las medidas y abrirlas ordenadas por desperdicio"""
+        self.ensure_one()
+        if not (self.alto_min or self.ancho_min or self.alto_max or self.ancho_max or self.grosor):
+            raise UserError('Indique al menos una medida.')
+        if (self.alto_max and self.alto_max < self.alto_min) or (self.ancho_max and self.ancho_max < self.ancho_min):
+            raise UserError('Los máximos no pueden ser menores que los mínimos.')
+        
+        quants = self.env['stock.quant']._buscar_placas_por_dimensiones(
+            alto_min=self.alto_min,
+            ancho_min=self.ancho_min,
+            alto_max=self.alto_max,
+            ancho_max=self.ancho_max,
+            grosor=self.grosor,
+            tolerancia=self.tolerancia,
+            tolerancia_grosor=self.tolerancia_grosor,
+            rotar=self.rotar,
+            product_id=self.product_id.id,
+            location_id=self.location_id.id,
+            partner_id=self.partner_id.id,
+            limit=self.limite or None,
+        )
+        
+        return {
+            'name': f'Placas de al menos {self.alto_min:g} x {self.ancho_min:g} m',
+            'type': 'ir.actions.act_window',
+            'res_model': 'stock.quant',
+            'view_mode': 'list',
+            'views': [(self.env.ref('stock_lot_dimensions.view_stock_quant_tree_dimensiones').id, 'list')],
+            'domain': [('id', 'in', quants.ids)],
+            'context': {'create': False},
+            'target': 'current',
+        }